@@ -0,0 +1,105 @@
+""" 命令行启动时间测试，超出预算或提前加载了重量级依赖时返回非零 """
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC = Path(__file__).parent
+ENTRIES = ["dlunzip", "rename", "messyCode"]
+# 这些依赖只能在真正需要时加载
+HEAVY = [
+    "wexpect",
+    "plyer",
+    "send2trash",
+    "httpx",
+    # lxml/__init__ 很轻，etree 才是真正的依赖
+    "lxml.etree",
+    "pydantic",
+    "rich",
+    "loguru",
+    "sentry_sdk",
+]
+
+_PROBE = """
+import sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = sorted(
+    {{
+        heavy
+        for name, module in list(sys.modules.items())
+        for heavy in {heavy!r}
+        if (name == heavy or name.startswith(heavy + "."))
+        and type(module).__name__ != "_LazyModule"
+    }}
+)
+print(elapsed, ",".join(loaded))
+"""
+
+
+def measure_import(module: str, repeat: int) -> tuple[float, list[str]]:
+    """返回导入模块的最短耗时（秒）和被加载的重量级依赖"""
+    best, loaded = float("inf"), []
+    code = _PROBE.format(src=str(SRC), module=module, heavy=HEAVY)
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+        if process.returncode:
+            raise RuntimeError(process.stderr.strip().splitlines()[-1])
+        output = process.stdout.split()
+        best = min(best, float(output[0]))
+        loaded = output[1].split(",") if len(output) > 1 else []
+    return best, loaded
+
+
+def measure_empty_run(repeat: int) -> float:
+    """返回对空文件夹运行 dlunzip 的最短耗时（秒）"""
+    best = float("inf")
+    with tempfile.TemporaryDirectory() as folder:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, str(SRC / "dlunzip.py"), "-p", folder],
+                capture_output=True,
+                check=True,
+            )
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", help="导入每个入口的预算（毫秒）", type=float, default=30)
+    parser.add_argument("--run-budget", help="空文件夹运行的预算（毫秒）", type=float, default=150)
+    parser.add_argument("-r", "--repeat", help="重复次数，取最小值", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for entry in ENTRIES:
+        try:
+            elapsed, loaded = measure_import(entry, args.repeat)
+        except RuntimeError as e:
+            failed = True
+            print(f"FAIL import {entry}: {e}")
+            continue
+        ok = elapsed * 1000 <= args.budget and not loaded
+        failed |= not ok
+        print(
+            f"{'OK  ' if ok else 'FAIL'} import {entry}: {elapsed * 1000:.1f} ms"
+            + (f" (加载了 {', '.join(loaded)})" if loaded else "")
+        )
+    try:
+        elapsed = measure_empty_run(args.repeat)
+    except subprocess.CalledProcessError as e:
+        failed = True
+        print(f"FAIL dlunzip 空文件夹: {e.stderr.decode().strip().splitlines()[-1]}")
+    else:
+        ok = elapsed * 1000 <= args.run_budget
+        failed |= not ok
+        print(f"{'OK  ' if ok else 'FAIL'} dlunzip 空文件夹: {elapsed * 1000:.1f} ms")
+    sys.exit(1 if failed else 0)
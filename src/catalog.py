@@ -0,0 +1,162 @@
+""" 记录每次解压得到的文件，可按文件名和标题全文检索 """
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import NamedTuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (
+    id INTEGER PRIMARY KEY,
+    archive TEXT NOT NULL,
+    rj_code TEXT,
+    title TEXT,
+    path TEXT NOT NULL,
+    extracted REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS releases_rj_code ON releases (rj_code);
+CREATE INDEX IF NOT EXISTS releases_path ON releases (path);
+CREATE TABLE IF NOT EXISTS members (
+    id INTEGER PRIMARY KEY,
+    release_id INTEGER NOT NULL REFERENCES releases (id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    crc TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS members_release_id ON members (release_id);
+"""
+# trigram 分词不依赖空格，适用于日文和中文的文件名
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS members_fts USING fts5 (
+    path, title, member_id UNINDEXED, tokenize = 'trigram'
+);
+"""
+_TRIGRAM = 3
+
+
+# 查询需要很快返回，不使用 pydantic
+class CatalogEntry(NamedTuple):
+    path: str
+    size: int
+    crc: str = ""
+
+
+class SearchResult(NamedTuple):
+    title: str | None
+    release_path: str
+    path: str
+    size: int
+    crc: str
+
+
+class Catalog:
+    catalog_file = Path(__file__).parent / "catalog.db"
+
+    def __init__(self, path: Path | str | None = None) -> None:
+        self.path = Path(path) if path else self.catalog_file
+        with closing(self._connect()) as db:
+            db.executescript(_SCHEMA)
+            try:
+                db.executescript(_FTS_SCHEMA)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite 低于 3.34 或没有编译 FTS5 时使用 LIKE
+                self.has_fts = False
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA foreign_keys = ON")
+        return db
+
+    def record(
+        self,
+        archive: str,
+        destination: Path,
+        rj_code: str | None,
+        title: str | None,
+        entries: list[CatalogEntry],
+    ) -> int:
+        """记录一次解压，同一目标文件夹的旧记录会被替换"""
+        with closing(self._connect()) as db, db:
+            old = [
+                row[0]
+                for row in db.execute(
+                    "SELECT id FROM releases WHERE path = ?", (str(destination),)
+                )
+            ]
+            for release_id in old:
+                if self.has_fts:
+                    db.execute(
+                        "DELETE FROM members_fts WHERE member_id IN "
+                        "(SELECT id FROM members WHERE release_id = ?)",
+                        (release_id,),
+                    )
+                db.execute("DELETE FROM releases WHERE id = ?", (release_id,))
+            release_id = db.execute(
+                "INSERT INTO releases (archive, rj_code, title, path, extracted) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (archive, rj_code, title, str(destination), time.time()),
+            ).lastrowid
+            for entry in entries:
+                member_id = db.execute(
+                    "INSERT INTO members (release_id, path, size, crc) "
+                    "VALUES (?, ?, ?, ?)",
+                    (release_id, entry.path, entry.size, entry.crc),
+                ).lastrowid
+                if self.has_fts:
+                    db.execute(
+                        "INSERT INTO members_fts (path, title, member_id) "
+                        "VALUES (?, ?, ?)",
+                        (entry.path, title or "", member_id),
+                    )
+        return release_id  # type: ignore
+
+    def search(self, query: str, limit: int = 50) -> list[SearchResult]:
+        """按文件名和标题检索，多个关键词之间为且的关系"""
+        terms = query.split()
+        if not terms:
+            return []
+        columns = "r.title, r.path, m.path, m.size, m.crc"
+        if self.has_fts and all(len(term) >= _TRIGRAM for term in terms):
+            # 每个关键词加上引号，避免被当作 FTS5 的语法
+            match = " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+            sql = (
+                f"SELECT {columns} FROM members_fts f "
+                "JOIN members m ON m.id = f.member_id "
+                "JOIN releases r ON r.id = m.release_id "
+                "WHERE members_fts MATCH ? ORDER BY f.rank LIMIT ?"
+            )
+            params = [match, limit]
+        else:
+            # 少于三个字无法使用 trigram 索引
+            condition = " AND ".join(
+                "(m.path LIKE ? ESCAPE '\\' OR r.title LIKE ? ESCAPE '\\')"
+                for _ in terms
+            )
+            sql = (
+                f"SELECT {columns} FROM members m "
+                "JOIN releases r ON r.id = m.release_id "
+                f"WHERE {condition} LIMIT ?"
+            )
+            params = []
+            for term in terms:
+                escaped = (
+                    term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                )
+                params.extend([f"%{escaped}%"] * 2)
+            params.append(limit)
+        with closing(self._connect()) as db:
+            return [SearchResult(*row) for row in db.execute(sql, params)]
+
+    def find_release(self, rj_code: str) -> list[SearchResult]:
+        """列出某个 RJ 号的所有文件"""
+        with closing(self._connect()) as db:
+            return [
+                SearchResult(*row)
+                for row in db.execute(
+                    "SELECT r.title, r.path, m.path, m.size, m.crc FROM releases r "
+                    "JOIN members m ON m.release_id = r.id "
+                    "WHERE r.rj_code = ? ORDER BY r.id, m.path",
+                    (rj_code.upper(),),
+                )
+            ]
@@ -1,5 +1,4 @@
-﻿from contextlib import contextmanager
-from pathlib import Path
+﻿from pathlib import Path
 
 from display import Display, LayoutName
 from model import File, Status
@@ -27,22 +26,8 @@ class ControlUnzip:
         self._now_file: File
         self._now_total: int
 
-    def _format_file_size(self, size: int) -> str:
-        if size > 1000 * 1024 * 1024:
-            return f"{(size / 1024 / 1024 / 1024):.0f} GB"
-        return f"{(size / 1024 / 1024):.0f} MB"
-
     def _get_files(self) -> list[File]:
-        return [
-            File(
-                name=file.name,
-                path=file,
-                size=self._format_file_size(file.stat().st_size),
-                size_bytes=file.stat().st_size,
-            )
-            for file in self.path.iterdir()
-            if file.is_file()
-        ]
+        return [File.from_path(file) for file in self.path.iterdir() if file.is_file()]
 
     def to_panel(self) -> Panel:
         tb = Table(
@@ -60,7 +45,7 @@ class ControlUnzip:
         ids = 0
         for ids, file in enumerate(self.files, 1):
             tb.add_row(str(ids), file.name, file.size, file.status.value)
-            if file.status == Status.DONE:
+            if file.status in (Status.DONE, Status.FAILED):
                 done_count += 1
         title = f"剩余{ids - done_count}，共{ids}" if ids else "没有文件需要解压"
         return Panel(
@@ -85,8 +70,15 @@ class ControlUnzip:
             expand=True,
         )
 
-    @contextmanager
-    def with_unzip_process(self, file: File):
+    # engine.ProgressSink
+    def set_files(self, files: list[File]):
+        self.files = files
+        self.refresh()
+
+    def refresh(self):
+        Display.display(LayoutName.FILES, self.to_panel())
+
+    def start(self, file: File):
         self._make_base_process()
         self._now_task = self._now_process.add_task("0%", total=file.size_bytes)
         self._now_file = file
@@ -101,11 +93,15 @@ class ControlUnzip:
             )
         )
         Display.display(LayoutName.PROCESS, Panel(progress_table))
-        yield
-        self._now_file.status = Status.DONE
+
+    def finish(self, file: File):
+        file.status = Status.DONE
         Display.display(LayoutName.FILES, self.to_panel())
         self._now_process.stop()
 
+    def update(self, completed: int, total: int = 0, filename: str = ""):
+        self.update_process(completed, total, filename)
+
     def update_process(
         self,
         completed: int,
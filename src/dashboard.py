@@ -0,0 +1,76 @@
+""" 显示共享任务队列中所有机器的状态 """
+import time
+from collections import Counter
+
+from jobqueue import JobQueue, JobStatus
+from rich.console import Group
+from rich.live import Live
+from rich.panel import Panel
+from rich.table import Table
+
+_STATUS_STYLE = {
+    JobStatus.PENDING.value: "white",
+    JobStatus.RUNNING.value: "cyan",
+    JobStatus.DONE.value: "green",
+    JobStatus.FAILED.value: "red",
+    JobStatus.PASSWORD.value: "yellow",
+}
+
+
+def _format_age(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    return f"{seconds / 60:.0f}m"
+
+
+def make_dashboard(queue: JobQueue) -> Group:
+    now = time.time()
+    jobs = queue.jobs()
+    counter = Counter(job["status"] for job in jobs)
+    summary = "  ".join(
+        f"[{style}]{status} {counter[status]}[/{style}]"
+        for status, style in _STATUS_STYLE.items()
+    )
+
+    workers = Table("机器", "当前任务", "心跳", "完成", "失败", expand=True)
+    for worker in queue.workers():
+        age = now - (worker["heartbeat"] or 0)
+        # 超过一个租约没有心跳视为离线
+        style = "red" if age > queue.lease else ""
+        workers.add_row(
+            worker["id"],
+            worker["current"] or "-",
+            _format_age(age),
+            str(worker["done"]),
+            str(worker["failed"]),
+            style=style,
+        )
+
+    unfinished = Table("文件名", "状态", "机器", "次数", "信息", expand=True)
+    for job in jobs:
+        if job["status"] == JobStatus.DONE.value:
+            continue
+        style = _STATUS_STYLE[job["status"]]
+        unfinished.add_row(
+            job["name"],
+            f"[{style}]{job['status']}[/{style}]",
+            job["worker"] or "-",
+            str(job["attempts"]),
+            job["message"],
+        )
+    return Group(
+        Panel(summary, title=f"[b]{queue.path}[/b]", border_style="magenta"),
+        Panel(workers, title="机器", border_style="green"),
+        Panel(unfinished, title="未完成", border_style="red"),
+    )
+
+
+def show_dashboard(queue: JobQueue, interval: float = 2):
+    """持续刷新，Ctrl+C 退出"""
+    with Live(make_dashboard(queue), refresh_per_second=1, screen=True) as live:
+        try:
+            while True:
+                time.sleep(interval)
+                live.update(make_dashboard(queue))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,164 @@
+""" 解压后去重：相同文件替换为硬链接/reflink """
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+# 每个摘要一行，每次解压只写入自己的文件
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    digest TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+
+def _reflink(origin: Path, target: Path) -> bool:
+    """在 btrfs/XFS 上创建 reflink，不支持时返回 False"""
+    if fcntl is None:
+        return False
+    try:
+        with origin.open("rb") as src, target.open("wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        target.unlink(missing_ok=True)
+        return False
+    return True
+
+
+class Deduplicator:
+    index_file = Path(__file__).parent / "dedup.db"
+
+    def __init__(
+        self,
+        mode: str = "auto",
+        min_size: int = 64 * 1024,
+        workers: int = 4,
+        chunk_size: int = 1024 * 1024,
+        path: Path | str | None = None,
+    ) -> None:
+        """
+        Args:
+            mode (str): auto (优先 reflink，失败则硬链接) / reflink / hardlink
+            min_size (int): 小于该大小的文件不参与去重
+            workers (int): 计算摘要的线程数
+            chunk_size (int): 每次读取的字节数
+            path (Path | str | None): 索引文件，默认为 src/dedup.db
+        """
+        if mode not in ("auto", "reflink", "hardlink"):
+            raise ValueError(f"unknown dedup mode: {mode}")
+        self.mode = mode
+        self.min_size = min_size
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.path = Path(path) if path else self.index_file
+        self._lock = threading.Lock()
+        with closing(self._connect()) as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _hash(self, file: Path) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        buf = bytearray(self.chunk_size)
+        view = memoryview(buf)
+        with file.open("rb") as f:
+            while n := f.readinto(buf):
+                digest.update(view[:n])
+        return f"{file.stat().st_size}:{digest.hexdigest()}"
+
+    def _link(self, origin: Path, target: Path) -> bool:
+        tmp = target.with_name(f"{target.name}.dedup")
+        try:
+            if self.mode != "hardlink" and _reflink(origin, tmp):
+                shutil.copystat(target, tmp)
+            elif self.mode != "reflink":
+                os.link(origin, tmp)
+            else:
+                return False
+            os.replace(tmp, target)
+        except OSError as e:
+            tmp.unlink(missing_ok=True)
+            logger.warning(f"去重失败 {target.name} - {e}")
+            return False
+        return True
+
+    def _get_origin(
+        self, db: sqlite3.Connection, digest: str, file: Path
+    ) -> Path | None:
+        """返回索引中内容相同的文件，索引过期时返回 None"""
+        row = db.execute(
+            "SELECT path, mtime_ns FROM digests WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        origin = Path(row[0])
+        try:
+            stat = origin.stat()
+        except OSError:
+            return None
+        if stat.st_mtime_ns != row[1] or origin == file:
+            return None
+        return origin
+
+    def dedup(self, root: Path) -> tuple[int, int]:
+        """对 root 下的文件去重
+
+        Returns:
+            tuple[int, int]: 链接的文件数，节省的字节数
+        """
+        files = [
+            file
+            for file in root.rglob("*")
+            if file.is_file()
+            and not file.is_symlink()
+            and file.stat().st_size >= self.min_size
+        ]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            digests = list(pool.map(self._hash, files))
+        linked = saved = 0
+        # 多个解压任务可以共用一个实例，多个进程通过写锁串行
+        with self._lock, closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for file, digest in zip(files, digests):
+                    origin = self._get_origin(db, digest, file)
+                    if origin is None:
+                        db.execute(
+                            "INSERT INTO digests (digest, path, mtime_ns)"
+                            " VALUES (?, ?, ?) ON CONFLICT (digest) DO UPDATE"
+                            " SET path = excluded.path, mtime_ns = excluded.mtime_ns",
+                            (digest, str(file), file.stat().st_mtime_ns),
+                        )
+                        continue
+                    if os.path.samefile(origin, file):
+                        continue
+                    # 硬链接和 reflink 都不能跨设备
+                    if origin.stat().st_dev != file.stat().st_dev:
+                        continue
+                    size = file.stat().st_size
+                    if self._link(origin, file):
+                        linked += 1
+                        saved += size
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return linked, saved
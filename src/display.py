@@ -35,47 +35,59 @@ class make_header:
 
 
 class Display:
-    console = Console(height=25)
-
-    install(console=console, show_locals=True)
-
-    layout = Layout(name="root")
-    layout_hander = Layout(name="hander", size=3)
-    default_logger_table = Table(
-        expand=True,
-        show_header=False,
-        header_style="bold",
-        title="[blue][b]Log Messages[/b]",
-        highlight=True,
-    )
-    default_logger_table.add_column("Log Output")
-    layout_logger = Layout(Panel(default_logger_table), name="logger", ratio=2)
-    layout_files = Layout(name="files")
-    layout_now_file = Layout(
-        Panel(
-            Text(" - ", justify="center", overflow="ellipsis"), border_style="magenta"
-        ),
-        name="now_file",
-    )
-    layout_process = Layout(name="process")
-
-    layout.split(layout_hander, Layout(name="main"))
-    layout["main"].split_row(layout_files, Layout(name="right"))
-    # layout["right"].split_column(layout_logger, layout_process)
-    layout["right"].split_column(layout_logger, Layout(name="right_bottom"))
-    layout["right_bottom"].split_column(layout_now_file, layout_process)
-
-    _layout_map = {
-        LayoutName.FILES: layout_files,
-        LayoutName.LOGGER: layout_logger,
-        LayoutName.PROCESS: layout_process,
-        LayoutName.NOW_FILE: layout_now_file,
-    }
+    console: Console
+    layout: Layout
+    layout_hander: Layout
+    default_logger_table: Table
+    layout_logger: Layout
+    layout_files: Layout
+    layout_now_file: Layout
+    layout_process: Layout
+    _layout_map: dict[LayoutName, Layout]
 
     _now_live: Live
 
+    @classmethod
+    def _build(cls):
+        """创建 console 和 layout，放在 layout_init 中以免导入时就执行"""
+        cls.console = Console(height=25)
+
+        install(console=cls.console, show_locals=True)
+
+        cls.layout = Layout(name="root")
+        cls.layout_hander = Layout(name="hander", size=3)
+        cls.default_logger_table = cls._make_defalut_logger_table()
+        cls.layout_logger = Layout(
+            Panel(cls.default_logger_table), name="logger", ratio=2
+        )
+        cls.layout_files = Layout(name="files")
+        cls.layout_now_file = Layout(
+            Panel(
+                Text(" - ", justify="center", overflow="ellipsis"),
+                border_style="magenta",
+            ),
+            name="now_file",
+        )
+        cls.layout_process = Layout(name="process")
+
+        cls.layout.split(cls.layout_hander, Layout(name="main"))
+        cls.layout["main"].split_row(cls.layout_files, Layout(name="right"))
+        # layout["right"].split_column(layout_logger, layout_process)
+        cls.layout["right"].split_column(cls.layout_logger, Layout(name="right_bottom"))
+        cls.layout["right_bottom"].split_column(
+            cls.layout_now_file, cls.layout_process
+        )
+
+        cls._layout_map = {
+            LayoutName.FILES: cls.layout_files,
+            LayoutName.LOGGER: cls.layout_logger,
+            LayoutName.PROCESS: cls.layout_process,
+            LayoutName.NOW_FILE: cls.layout_now_file,
+        }
+
     @classmethod
     def layout_init(cls):
+        cls._build()
         cls.layout_hander.update(make_header())
         # cls.layout_logger.update(Panel(cls.default_logger_table, border_style="red"))
         cls.layout_process.update(Panel("process", border_style="magenta"))
@@ -1,34 +1,82 @@
-import random
+from __future__ import annotations
+
+import os
 import re
-import shutil
 from pathlib import Path
 from time import sleep
-from send2trash import send2trash
-import wexpect
-from control import ControlUnzip
-from display import Display, LayoutName
-from exception import NotArchiveError, PasswordError
-from loguru._logger import Logger
-from password.handler import Pw, PWhandler
-from plyer import notification
-from rich_log import set_rich_logger
-from util.rjcode import get_rj_title
-from wexpect.legacy_wexpect import spawn_windows
+from typing import TYPE_CHECKING
+
+from util.disk import DiskLimiter
+from util.lazy import lazy_import
+from util.size import parse_size
+
+if TYPE_CHECKING:
+    from catalog import Catalog
+    from control import ControlUnzip
+    from dedup import Deduplicator
+    from engine import BatchRunner
+    from jobqueue import JobQueue
+    from loguru._logger import Logger
+    from scheduler import Scheduler
+    from util.filter import MemberFilter
+    from util.native import NativeZipExtractor
+
+# 启动时只加载命令行需要的模块，其余在第一次使用时加载
+catalog = lazy_import("catalog")
+plyer = lazy_import("plyer")
+control = lazy_import("control")
+dedup = lazy_import("dedup")
+display = lazy_import("display")
+engine = lazy_import("engine")
+handler = lazy_import("password.handler")
+jobqueue = lazy_import("jobqueue")
+rich_log = lazy_import("rich_log")
+filters = lazy_import("util.filter")
+native = lazy_import("util.native")
+scheduler = lazy_import("scheduler")
+
+
+class DesktopNotifier:
+    def notify(self, title: str, message: str) -> None:
+        plyer.notification.notify(
+            title=title,
+            message=message,
+            app_name="DlUnzip",
+            timeout=5,
+        )  # type: ignore
 
 
 class DlUnzip:
-    def __init__(self, path: Path | str) -> None:
+    """终端界面，解压由 engine 完成"""
+
+    def __init__(
+        self,
+        path: Path | str,
+        deduplicator: Deduplicator | None = None,
+        member_filter: MemberFilter | None = None,
+        output: Path | str | None = None,
+        native: NativeZipExtractor | None = None,
+        verify_workers: int = 0,
+        scheduler: Scheduler | None = None,
+        catalog: Catalog | None = None,
+    ) -> None:
         self.path = path if isinstance(path, Path) else Path(path)
+        self.deduplicator = deduplicator
+        self.member_filter = member_filter
+        self.output = output
+        self.native = native
+        self.verify_workers = verify_workers
+        self.scheduler = scheduler
+        self.catalog = catalog
         self.logger: Logger
         self.control: ControlUnzip
-        self._is_show_password_info_once = False
 
     def set_logger(self):
-        logger = set_rich_logger(
-            Display.default_logger_table,
-            Display.layout_logger,
+        logger = rich_log.set_rich_logger(
+            display.Display.default_logger_table,
+            display.Display.layout_logger,
             "INFO",
-            Display.redraw_logger_table,
+            display.Display.redraw_logger_table,
         )
         logger.add(
             Path(__file__).parent / "logs" / "dlunzip.log",
@@ -38,240 +86,190 @@ class DlUnzip:
         )
         self.logger = logger  # type: ignore
 
-    def update_files_layout(self):
-        Display.display(LayoutName.FILES, self.control.to_panel())
-
-    def process_str_handler(self, info: str):
-        if "Physical Size" in info:
-            if match := re.search(r"Physical Size = (\d+)", info):
-                self.control.update_process(0, int(match[1]))
-
-    def is_child_unzipable(self, path: Path):
-        return all(file.is_file() for file in path.iterdir()) and all(
-            file.suffix not in [".mp3", ".wav"] for file in path.iterdir()
+    def _make_runner(self) -> BatchRunner:
+        """进入界面后才能设置 logger 和进度"""
+        self.set_logger()
+        self.control = control.ControlUnzip(self.path)
+        extractor = engine.Extractor(
+            output=self.output,
+            member_filter=self.member_filter,
+            native=self.native,
+            deduplicator=self.deduplicator,
+            catalog=self.catalog,
+            passwords=handler.PWhandler.store,
+            prompt=display.Display,  # type: ignore
+            notifier=DesktopNotifier(),
+            progress=self.control,
+            logger=self.logger,
+        )
+        extractor.check_output(self.path)
+        self.control.refresh()
+        return engine.BatchRunner(
+            extractor,
+            self.scheduler,
+            self.verify_workers,
+            Path(__file__).parent / "logs",
         )
 
-    def process_handler(self, process: spawn_windows, password: str):
-        use_password = False
-        is_show_process_info = False
-        is_show_once = False
-        try:
-            while True:
-                index = process.expect(
-                    [
-                        "Enter password",
-                        "ERROR: Wrong password",
-                        "Cannot open encrypted archive. Wrong password?",
-                        "ERROR: Data Error in encrypted file. Wrong password?",
-                        "ERROR: CRC Failed in encrypted file. Wrong password?",
-                        "Cannot open the file as archive",
-                        "([^\r\n]+)\r\n",
-                        "(\d+%[^\r\n]+)",
-                        "(\d+)%",
-                        "Everything is Ok",
-                        wexpect.EOF,
-                    ]
-                )
-                if process.match == wexpect.EOF:
-                    self.logger.warning("EOF")
-                    return
-                if index == 0:
-                    use_password = True
-                    process.sendline(password)
-                elif index in [1, 2, 3, 4]:
-                    if not self._is_show_password_info_once:
-                        self._is_show_password_info_once = True
-                        self.logger.info("加密压缩包，尝试使用密码库解压")
-                    process.kill()
-                    try:
-                        process.terminate(force=True)
-                    except Exception:
-                        break
-                    raise PasswordError
-                elif index == 5:
-                    raise NotArchiveError
-                elif index == 6:
-                    self.process_str_handler(process.match.group(0).strip())  # type: ignore
-                elif index in [7, 8]:
-                    is_show_process_info, is_show_once = self.handle_index_67(
-                        index,
-                        process,
-                        is_show_process_info,
-                        is_show_once,
-                        password,
-                        use_password,
-                    )
-                elif index == 9:
-                    return
-                # 一般来说，这里不会出现EOF
-                elif index == 10:
-                    self.logger.warning("EOF")
-                    return
-        finally:
-            if process.isalive():
-                process.close()
-
-    def handle_index_67(
-        self,
-        index: int,
-        process: spawn_windows,
-        is_show_process_info: bool,
-        is_show_once: bool,
-        password: str,
-        use_password: bool,
-    ):
-        if not is_show_process_info and is_show_once:
-            if use_password:
-                self.logger.info(f"开始解压 - 使用密码{password}")
-            else:
-                self.logger.info("开始解压 - 无密码")
-            is_show_process_info = True
-        info = process.match.group(0).strip()  # type: ignore
-        compile_per = int(info.split("%")[0])
-        filename = "".join(info.split("-")[1:]).strip() if index == 6 else ""
-        self.control.update_process(compile_per, filename=filename)
-        is_show_once = True
-        return is_show_process_info, is_show_once
-
-    def unzip_child(self, path: Path):
-        is_first = True
-        for file in path.iterdir():
-            if file.is_file():
-                # 检查分卷
-                if not is_first and "part" in file.stem:
-                    self.logger.warning(f"Skip {file.stem} 疑似是分卷文件，不压缩")
-                    continue
-                self.unzip(file, is_child=True)
-                is_first = False
-        # TODO 检查分卷是否全部解压，有则删除并移动文件
-
-    def move_file(self, file: Path):
-        file_list = list(file.iterdir())
-        if len(file_list) == 1 and file_list[0].is_dir():
-            for file_ in file_list[0].iterdir():
-                if (file / file_.name).exists():
-                    file_.rename(file / f"{file_.name}{random.randint(0, 1000)}")
-                else:
-                    file_.rename(file / file_.name)
-            file_list[0].rmdir()
-            self.move_file(file)
-
-    def extract(self, path: Path, password: str, is_child: bool = False) -> bool:
-        new_path = path.parent / path.stem
-        new_path.mkdir(exist_ok=True)
-        archive_path = str(path)
-        destination_path = str(new_path)
-        cmd = " ".join(["7z", "x", f"'{archive_path}'", f"-o'{destination_path}'"])
-        process = wexpect.spawn(cmd)
-        try:
-            self.process_handler(process, password)
-        except PasswordError as e:
-            if new_path.exists():
-                shutil.rmtree(path=new_path)
-            raise PasswordError from e
-        self.logger.success(f"解压完成 - {new_path.stem}")
-        # path.unlink()
-        send2trash(path)
-        title = None if is_child else get_rj_title(new_path.stem)
-        if title:
-            if (new_path.parent / title).exists():
-                title = f"{title}{random.randint(0, 1000)}"
-            new_path = new_path.rename(new_path.parent / title)
-            self.logger.success(f"重命名 - {new_path.stem}")
-        notification.notify(
-            title="解压成功",
-            message=f"解压 {Path(archive_path).name} to {Path(destination_path).name} 成功",
-            app_name="DlUnzip",
-            timeout=5,
-        )  # type: ignore
-        # 不判断是否为子文件夹，直接移动
-        self.move_file(new_path)
-        self.logger.success("移动文件完成")
-        if self.is_child_unzipable(new_path):
-            self.logger.info(f"检测到{new_path.stem}为分卷文件，开始解压")
-            self.unzip_child(new_path)
-        if not is_child:
-            self.move_file(new_path)
-            self.logger.success("移动文件完成")
-
-        return True
-
-    def _save_pw(self, pw: Pw):
-        if not pw.value.startswith("RJ"):
-            PWhandler.add_pw(pw.value)
-            self.logger.info(f"添加并保存密码： {pw.value}")
-
-    def unzip(self, path: Path, is_child: bool = False):
-        if "." not in path.name:
-            self.logger.success(
-                f"Rename {path.name} to {path.with_suffix('.zip').name}"
-            )
-            path = path.rename(path.with_suffix(".zip"))
-        pws = PWhandler.get_all_pws(path.name)
-        self._is_show_password_info_once = False
-        for pw in pws:
-            try:
-                self.extract(path, pw.value, is_child)
-                return
-            except PasswordError:
-                if pw == pws[-1]:
-                    self.logger.error(f"{path.stem} 密码库无匹配密码")
-                    break
-                continue
-            except NotArchiveError:
-                self.logger.error(f"{path.stem} 不是压缩文件")
-                return
-        notification.notify(
-            title="请输入密码",
-            message=f"请为 {path} 文件输入密码",
-            app_name="DlUnzip",
-            timeout=5,
-        )  # type: ignore
-        while True:
-            pw_input = Display.ask_for_password(path.stem)
-            try:
-                if self.extract(path, pw_input, is_child):
-                    self._save_pw(Pw(value=pw_input))
-                    break
-            except PasswordError:
-                continue
-
-    def run(self):
-        PWhandler.load_all_pws()
-        Display.layout_init()
-        with Display.live():
-            self.set_logger()
-            self.control = ControlUnzip(self.path)
-            self.update_files_layout()
+    def run(self, verify_only: bool = False):
+        handler.PWhandler.load_all_pws()
+        display.Display.layout_init()
+        with display.Display.live():
+            runner = self._make_runner()
             sleep(1)
-            last_file_name = ""
-            for file in self.control.files:
-                if file.path.stem == last_file_name and file.path.suffix != ".zip":
-                    self.logger.warning(f"Skip {file.path.stem} - 疑似分卷文件，跳过")
-                    continue
-                with self.control.with_unzip_process(file):
-                    self.unzip(file.path)
-                self.update_files_layout()
-                last_file_name = file.path.stem
-            self.logger.success("解压完成")
+            runner.run(self.control.files, verify_only)
+            sleep(1)
+
+    def run_worker(self, queue: JobQueue):
+        """与其他机器共享任务队列，直到队列中没有可领取的任务"""
+        handler.PWhandler.load_all_pws()
+        display.Display.layout_init()
+        with display.Display.live():
+            runner = self._make_runner()
+            runner.run_worker(self.control.files, self.path, queue)
             sleep(1)
 
 
 if __name__ == "__main__":
     import argparse
-    import os
-
-    import sentry_sdk
 
     parse = argparse.ArgumentParser()
     path = parse.add_argument("-p", "--path", help="需要解压的文件夹", type=str)
+    parse.add_argument(
+        "-o", "--output", help="解压输出的文件夹，默认为压缩包所在文件夹", type=str
+    )
+    parse.add_argument("--dedup", help="解压后对相同文件去重", action="store_true")
+    parse.add_argument(
+        "--dedup-mode",
+        help="去重方式",
+        choices=["auto", "reflink", "hardlink"],
+        default="auto",
+    )
+    parse.add_argument("--dedup-file", help="去重索引，默认为 src/dedup.db", type=str)
+    parse.add_argument(
+        "-i", "--include", help="只解压匹配的文件，可多次指定", action="append"
+    )
+    parse.add_argument(
+        "-x", "--exclude", help="不解压匹配的文件，可多次指定", action="append"
+    )
+    parse.add_argument("--min-size", help="跳过小于该大小的文件，如 100K", type=parse_size)
+    parse.add_argument("--max-size", help="跳过大于该大小的文件，如 2G", type=parse_size)
+    parse.add_argument(
+        "--native", help="zip 不经过 7z 直接解压，内存占用有上限", action="store_true"
+    )
+    parse.add_argument(
+        "--memory-limit",
+        help="--native 时每个线程的内存上限，如 16M",
+        type=parse_size,
+        default=16 * 1024 * 1024,
+    )
+    parse.add_argument("--workers", help="--native 时同时解压的文件数", type=int, default=1)
+    parse.add_argument(
+        "--verify", help="解压前并行校验压缩包，跳过损坏的文件", action="store_true"
+    )
+    parse.add_argument("--verify-only", help="只校验，不解压", action="store_true")
+    parse.add_argument("--verify-workers", help="同时校验的压缩包数", type=int, default=4)
+    parse.add_argument(
+        "--order",
+        help="解压顺序，可用逗号组合：name, size, password, oldest",
+        type=str,
+        default="name",
+    )
+    parse.add_argument("--disk-jobs", help="每块磁盘同时读取的压缩包数", type=int, default=2)
+    parse.add_argument("--queue", help="多台机器共享的任务队列数据库", type=str)
+    parse.add_argument("--lease", help="任务租约时长（秒）", type=float, default=60)
+    parse.add_argument(
+        "--queue-status", help="显示任务队列中所有机器的状态", action="store_true"
+    )
+    parse.add_argument("--catalog", help="把解压得到的文件记录到目录中", action="store_true")
+    parse.add_argument("--catalog-file", help="目录数据库，默认为 src/catalog.db", type=str)
+    subparsers = parse.add_subparsers(dest="command")
+    query = subparsers.add_parser("query", help="在目录中查找文件")
+    query.add_argument("terms", help="文件名或标题中的关键词，或 RJ 号", nargs="+")
+    query.add_argument("-n", "--limit", help="最多显示的结果数", type=int, default=50)
+    # 不设置默认值，否则会覆盖写在 query 之前的 --catalog-file
+    query.add_argument(
+        "--catalog-file",
+        help="目录数据库，默认为 src/catalog.db",
+        type=str,
+        default=argparse.SUPPRESS,
+    )
     args = parse.parse_args()
-    if args.path:
+    if args.command == "query":
+        terms = " ".join(args.terms)
+        catalog_file = (
+            Path(args.catalog_file)
+            if args.catalog_file
+            else catalog.Catalog.catalog_file
+        )
+        # 查询时不创建空的数据库
+        if not catalog_file.exists():
+            parse.error(f"目录不存在: {catalog_file}")
+        library = catalog.Catalog(catalog_file)
+        if code := re.fullmatch(r"RJ(\d{6}|\d{8})", terms.strip(), re.IGNORECASE):
+            results = library.find_release(f"RJ{code[1]}")
+        else:
+            results = library.search(terms, args.limit)
+        for result in results:
+            print(f"{result.title or '-'} | {result.path} | {result.size} B")
+        if not results:
+            print("没有找到文件")
+    elif args.queue_status:
+        if not args.queue:
+            parse.error("--queue-status 需要同时指定 --queue")
+        lazy_import("dashboard").show_dashboard(
+            jobqueue.JobQueue(args.queue, args.lease)
+        )
+    elif args.path:
+        if args.queue and args.verify_only:
+            parse.error("--verify-only 不能与 --queue 同时使用")
+        if not any(file.is_file() for file in Path(args.path).iterdir()):
+            print("没有文件需要解压")
+            exit()
         if _dsn := os.getenv("SENTRY_DSN"):
+            import sentry_sdk
+
             sentry_sdk.init(
                 dsn=_dsn,
                 traces_sample_rate=1.0,
             )
-        DlUnzip(args.path).run()
+        deduplicator = (
+            dedup.Deduplicator(args.dedup_mode, path=args.dedup_file)
+            if args.dedup
+            else None
+        )
+        member_filter = None
+        if args.include or args.exclude or args.min_size or args.max_size:
+            member_filter = filters.MemberFilter(
+                include=args.include or [],
+                exclude=args.exclude or [],
+                min_size=args.min_size,
+                max_size=args.max_size,
+            )
+        extractor = (
+            native.NativeZipExtractor(args.memory_limit, args.workers)
+            if args.native
+            else None
+        )
+        verify_workers = args.verify_workers if args.verify or args.verify_only else 0
+        try:
+            policies = [scheduler.Policy(name) for name in args.order.split(",")]
+        except ValueError as e:
+            parse.error(str(e))
+        disk_limiter = DiskLimiter(args.disk_jobs)
+        dl_unzip = DlUnzip(
+            args.path,
+            deduplicator,
+            member_filter,
+            args.output,
+            extractor,
+            verify_workers,
+            scheduler.Scheduler(policies, disk_limiter),
+            catalog.Catalog(args.catalog_file) if args.catalog else None,
+        )
+        if args.queue:
+            dl_unzip.run_worker(jobqueue.JobQueue(args.queue, args.lease))
+        else:
+            dl_unzip.run(args.verify_only)
     else:
         print("请输入需要解压的文件夹")
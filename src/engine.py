@@ -0,0 +1,722 @@
+""" 解压引擎，不依赖终端界面，可以嵌入到其他程序中
+
+界面、密码来源、通知和进度都通过参数传入。同一进程中同时运行多个任务时，
+每个任务使用自己的 `Extractor` 和 `BatchRunner`；`PasswordStore`、
+`Deduplicator`、`Catalog` 和 `DiskLimiter` 可以在任务之间共用。
+终端界面 (`Display`) 是全局的，同一进程中只能有一个。
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Protocol
+from zipfile import BadZipFile, ZipFile
+
+from exception import (
+    LeaseLostError,
+    NotArchiveError,
+    PasswordError,
+    UnsupportedArchiveError,
+)
+from util.lazy import lazy_import
+
+if TYPE_CHECKING:
+    from catalog import Catalog
+    from dedup import Deduplicator
+    from jobqueue import JobQueue
+    from loguru._logger import Logger
+    from model import File
+    from scheduler import Scheduler
+    from util.filter import MemberFilter
+    from util.native import NativeZipExtractor
+    from wexpect.legacy_wexpect import spawn_windows
+
+catalog = lazy_import("catalog")
+send2trash = lazy_import("send2trash")
+wexpect = lazy_import("wexpect")
+loguru = lazy_import("loguru")
+handler = lazy_import("password.handler")
+jobqueue = lazy_import("jobqueue")
+model = lazy_import("model")
+rjcode = lazy_import("util.rjcode")
+scheduler = lazy_import("scheduler")
+sevenzip = lazy_import("util.sevenzip")
+verify = lazy_import("verify")
+
+
+class PasswordSource(Protocol):
+    def candidates(self, filename: str) -> list[str]:
+        """根据文件名返回候选密码"""
+        ...
+
+    def save(self, password: str) -> None:
+        """保存用户输入的正确密码"""
+        ...
+
+
+class PasswordPrompt(Protocol):
+    def ask_for_password(self, filename: str) -> str | None:
+        """向用户询问密码，返回 None 表示跳过该文件"""
+        ...
+
+
+class Notifier(Protocol):
+    def notify(self, title: str, message: str) -> None:
+        ...
+
+
+class ProgressSink(Protocol):
+    def set_files(self, files: list[File]) -> None:
+        """文件列表或顺序发生变化"""
+        ...
+
+    def refresh(self) -> None:
+        """文件状态发生变化"""
+        ...
+
+    def start(self, file: File) -> None:
+        ...
+
+    def update(self, completed: int, total: int = 0, filename: str = "") -> None:
+        """completed 为百分比，filename 为压缩包中的文件名"""
+        ...
+
+    def finish(self, file: File) -> None:
+        ...
+
+
+class NoPrompt:
+    """不询问密码，密码库中没有密码的文件直接跳过"""
+
+    def ask_for_password(self, filename: str) -> str | None:
+        return None
+
+
+class NullNotifier:
+    def notify(self, title: str, message: str) -> None:
+        pass
+
+
+class NullProgress:
+    def set_files(self, files: list[File]) -> None:
+        pass
+
+    def refresh(self) -> None:
+        pass
+
+    def start(self, file: File) -> None:
+        file.status = model.Status.DING
+
+    def update(self, completed: int, total: int = 0, filename: str = "") -> None:
+        pass
+
+    def finish(self, file: File) -> None:
+        file.status = model.Status.DONE
+
+
+class Extractor:
+    def __init__(
+        self,
+        *,
+        output: Path | str | None = None,
+        member_filter: MemberFilter | None = None,
+        native: NativeZipExtractor | None = None,
+        deduplicator: Deduplicator | None = None,
+        catalog: Catalog | None = None,
+        passwords: PasswordSource | None = None,
+        prompt: PasswordPrompt | None = None,
+        notifier: Notifier | None = None,
+        progress: ProgressSink | None = None,
+        logger: Logger | None = None,
+    ) -> None:
+        """
+        Args:
+            output (Path | str | None): 解压输出的文件夹，默认为压缩包所在文件夹
+            passwords (PasswordSource | None): 密码来源，默认为空的内存密码库
+            prompt (PasswordPrompt | None): 密码库中没有密码时询问，默认跳过
+            notifier (Notifier | None): 解压成功或需要密码时的通知
+            progress (ProgressSink | None): 接收文件状态和解压进度
+            logger (Logger | None): 默认为 loguru 的全局 logger
+        """
+        self.output = Path(output) if output else None
+        self.member_filter = member_filter
+        self.native = native
+        self.deduplicator = deduplicator
+        self.catalog = catalog
+        self.passwords: PasswordSource = passwords or handler.PasswordStore()
+        self.prompt: PasswordPrompt = prompt or NoPrompt()
+        self.notifier: Notifier = notifier or NullNotifier()
+        self.progress: ProgressSink = progress or NullProgress()
+        self.logger: Logger = logger or loguru.logger  # type: ignore
+        # 校验或排序时已经找到的密码
+        self.known_pws: dict[Path, str] = {}
+        self._titles: dict[Path, str] = {}
+        # 顶层压缩包已经占用的目标文件夹，由 get_destination 创建
+        self._destinations: dict[Path, Path] = {}
+        # 过滤掉了部分文件的压缩包，解压后不删除
+        self._filtered: set[Path] = set()
+        self._is_show_password_info_once = False
+        # 删除压缩包前调用，抛出异常时放弃这次解压
+        self.confirm: Callable[[], None] | None = None
+
+    def process_str_handler(self, info: str):
+        if "Physical Size" in info:
+            if match := re.search(r"Physical Size = (\d+)", info):
+                self.progress.update(0, int(match[1]))
+
+    def is_child_unzipable(self, path: Path):
+        return all(file.is_file() for file in path.iterdir()) and all(
+            file.suffix not in [".mp3", ".wav"] for file in path.iterdir()
+        )
+
+    def process_handler(self, process: spawn_windows, password: str):
+        use_password = False
+        is_show_process_info = False
+        is_show_once = False
+        try:
+            while True:
+                index = process.expect(
+                    [
+                        "Enter password",
+                        "ERROR: Wrong password",
+                        "Cannot open encrypted archive. Wrong password?",
+                        "ERROR: Data Error in encrypted file. Wrong password?",
+                        "ERROR: CRC Failed in encrypted file. Wrong password?",
+                        "Cannot open the file as archive",
+                        "([^\r\n]+)\r\n",
+                        "(\d+%[^\r\n]+)",
+                        "(\d+)%",
+                        "Everything is Ok",
+                        wexpect.EOF,
+                    ]
+                )
+                if process.match == wexpect.EOF:
+                    self.logger.warning("EOF")
+                    return
+                if index == 0:
+                    use_password = True
+                    process.sendline(password)
+                elif index in [1, 2, 3, 4]:
+                    if not self._is_show_password_info_once:
+                        self._is_show_password_info_once = True
+                        self.logger.info("加密压缩包，尝试使用密码库解压")
+                    process.kill()
+                    try:
+                        process.terminate(force=True)
+                    except Exception:
+                        break
+                    raise PasswordError
+                elif index == 5:
+                    raise NotArchiveError
+                elif index == 6:
+                    self.process_str_handler(process.match.group(0).strip())  # type: ignore
+                elif index in [7, 8]:
+                    is_show_process_info, is_show_once = self.handle_index_67(
+                        index,
+                        process,
+                        is_show_process_info,
+                        is_show_once,
+                        password,
+                        use_password,
+                    )
+                elif index == 9:
+                    return
+                # 一般来说，这里不会出现EOF
+                elif index == 10:
+                    self.logger.warning("EOF")
+                    return
+        finally:
+            if process.isalive():
+                process.close()
+
+    def handle_index_67(
+        self,
+        index: int,
+        process: spawn_windows,
+        is_show_process_info: bool,
+        is_show_once: bool,
+        password: str,
+        use_password: bool,
+    ):
+        if not is_show_process_info and is_show_once:
+            if use_password:
+                self.logger.info(f"开始解压 - 使用密码{password}")
+            else:
+                self.logger.info("开始解压 - 无密码")
+            is_show_process_info = True
+        info = process.match.group(0).strip()  # type: ignore
+        compile_per = int(info.split("%")[0])
+        filename = "".join(info.split("-")[1:]).strip() if index == 6 else ""
+        self.progress.update(compile_per, filename=filename)
+        is_show_once = True
+        return is_show_process_info, is_show_once
+
+    def unzip_child(self, path: Path):
+        is_first = True
+        for file in path.iterdir():
+            if file.is_file():
+                # 检查分卷
+                if not is_first and "part" in file.stem:
+                    self.logger.warning(f"Skip {file.stem} 疑似是分卷文件，不压缩")
+                    continue
+                self.unzip(file, is_child=True)
+                is_first = False
+        # TODO 检查分卷是否全部解压，有则删除并移动文件
+
+    def move_file(self, file: Path):
+        file_list = list(file.iterdir())
+        if len(file_list) == 1 and file_list[0].is_dir():
+            for file_ in file_list[0].iterdir():
+                if (file / file_.name).exists():
+                    file_.rename(file / f"{file_.name}{random.randint(0, 1000)}")
+                else:
+                    file_.rename(file / file_.name)
+            file_list[0].rmdir()
+            self.move_file(file)
+
+    def select_members(self, path: Path, password: str) -> list[str] | None:
+        """按过滤条件筛选需要解压的文件，None 表示全部解压"""
+        if not self.member_filter:
+            return None
+        members = [m for m in sevenzip.list_members(path, password) if not m.is_dir]
+        selected = [m.path for m in members if self.member_filter.match(m)]
+        if len(selected) == len(members):
+            return None
+        self._filtered.add(path)
+        self.logger.info(f"过滤后解压 {len(selected)}/{len(members)} 个文件")
+        return selected
+
+    def _write_listfile(self, members: list[str]) -> str:
+        fd, listfile = tempfile.mkstemp(prefix="dlunzip-", suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(members))
+        return listfile
+
+    def get_destination(self, path: Path, is_child: bool = False) -> Path:
+        """解压目标文件夹，顶层压缩包直接解压到以 RJ 标题命名的文件夹
+
+        顶层压缩包的文件夹在这里创建，多个进程解压到同一个输出文件夹时不会选中同一个名字。
+        """
+        if is_child:
+            return path.parent / path.stem
+        if path in self._destinations:
+            return self._destinations[path]
+        root = self.output or path.parent
+        root.mkdir(parents=True, exist_ok=True)
+        name = self.get_title(path)
+        # 输出文件夹中可能已有同名的作品，不能解压到其中
+        destination = root / name
+        while True:
+            try:
+                destination.mkdir()
+                break
+            except FileExistsError:
+                destination = root / f"{name}{random.randint(0, 1000)}"
+        if destination.name != path.stem:
+            self.logger.info(f"解压到 - {destination.name}")
+        self._destinations[path] = destination
+        return destination
+
+    def get_title(self, path: Path) -> str:
+        """RJ 标题，获取不到时使用原文件名，换密码重试时不再请求"""
+        if path not in self._titles:
+            try:
+                title = rjcode.get_rj_title(path.stem)
+            except Exception as e:
+                # 获取不到标题时使用原文件名，不影响解压
+                self.logger.warning(f"获取 {path.stem} 的标题失败 - {e}")
+                title = None
+            self._titles[path] = title or path.stem
+        return self._titles[path]
+
+    def release_destination(self, path: Path, new_path: Path, owned: bool):
+        """解压失败时删除这次占用的文件夹，下次解压重新选择"""
+        if owned and new_path.exists():
+            shutil.rmtree(path=new_path)
+        self._destinations.pop(path, None)
+
+    def _extract_7z(self, path: Path, new_path: Path, password: str) -> bool:
+        members = self.select_members(path, password)
+        if members is not None and not members:
+            self.logger.warning(f"Skip {path.name} - 没有符合过滤条件的文件")
+            return False
+        new_path.mkdir(parents=True, exist_ok=True)
+        cmd = ["7z", "x", f"'{path}'", f"-o'{new_path}'"]
+        listfile = None
+        if members is not None:
+            listfile = self._write_listfile(members)
+            # -spd: 列表中的 [ ] * ? 等按普通字符处理，不作为通配符
+            cmd.extend(["-scsUTF-8", "-spd", f"@'{listfile}'"])
+        process = wexpect.spawn(" ".join(cmd))
+        try:
+            self.process_handler(process, password)
+        finally:
+            if listfile:
+                os.unlink(listfile)
+        return True
+
+    def _extract_native(
+        self, path: Path, new_path: Path, password: str
+    ) -> bool | None:
+        """不经过 7z 直接解压 zip，不支持时返回 None"""
+        if not self.native or path.suffix.lower() != ".zip":
+            return None
+        try:
+            count = self.native.extract(
+                path,
+                new_path,
+                password,
+                self.member_filter,
+                lambda completed, filename: self.progress.update(
+                    completed, filename=filename
+                ),
+            )
+        except UnsupportedArchiveError as e:
+            self.logger.info(f"使用 7z 解压 {path.name} - {e}")
+            return None
+        except BadZipFile as e:
+            self.logger.error(f"{path.name} 已损坏 - {e}")
+            raise NotArchiveError from e
+        if not count:
+            self.logger.warning(f"Skip {path.name} - 没有符合过滤条件的文件")
+            return False
+        if self.member_filter:
+            with ZipFile(path) as zf:
+                total = sum(not info.is_dir() for info in zf.infolist())
+            if count < total:
+                self._filtered.add(path)
+                self.logger.info(f"过滤后解压 {count}/{total} 个文件")
+        return True
+
+    def extract(self, path: Path, password: str, is_child: bool = False) -> bool:
+        # 只清理这次创建的文件夹，子压缩包的文件夹中可能有之前解压的文件
+        owned = not is_child or not (path.parent / path.stem).exists()
+        new_path = self.get_destination(path, is_child)
+        try:
+            extracted = self._extract_native(path, new_path, password)
+            if extracted is None:
+                extracted = self._extract_7z(path, new_path, password)
+        except (PasswordError, NotArchiveError):
+            self._filtered.discard(path)
+            self.release_destination(path, new_path, owned)
+            raise
+        if not extracted:
+            self._filtered.discard(path)
+            self.release_destination(path, new_path, owned)
+            return False
+        self.logger.success(f"解压完成 - {new_path.name}")
+        if self.confirm and not is_child:
+            try:
+                self.confirm()
+            except Exception:
+                self._filtered.discard(path)
+                self.release_destination(path, new_path, owned)
+                raise
+        crcs = self.list_crcs(path, password) if self.catalog and not is_child else {}
+        if path in self._filtered:
+            # 压缩包中还有没解压的文件，删除后就找不回来了
+            self._filtered.discard(path)
+            self.logger.info(f"只解压了部分文件，保留 {path.name}")
+        else:
+            # path.unlink()
+            send2trash.send2trash(path)
+        self.notifier.notify("解压成功", f"解压 {path.name} to {new_path.name} 成功")
+        # 不判断是否为子文件夹，直接移动
+        self.move_file(new_path)
+        self.logger.success("移动文件完成")
+        if self.is_child_unzipable(new_path):
+            self.logger.info(f"检测到{new_path.stem}为分卷文件，开始解压")
+            self.unzip_child(new_path)
+        if not is_child:
+            self.move_file(new_path)
+            self.logger.success("移动文件完成")
+            if self.catalog:
+                self.record(path, new_path, crcs)
+            if self.deduplicator:
+                self.dedup(new_path)
+
+        return True
+
+    def list_crcs(self, path: Path, password: str) -> dict[tuple[str, int], str]:
+        """压缩包中文件的 CRC，按文件名和大小查找"""
+        try:
+            members = sevenzip.list_members(path, password)
+        except (PasswordError, NotArchiveError):
+            return {}
+        return {
+            (Path(m.path.replace("\\", "/")).name.lower(), m.size): m.crc
+            for m in members
+            if not m.is_dir
+        }
+
+    def record(self, path: Path, new_path: Path, crcs: dict[tuple[str, int], str]):
+        """把解压后的文件记录到目录中"""
+        entries = []
+        for file in new_path.rglob("*"):
+            if not file.is_file():
+                continue
+            size = file.stat().st_size
+            entries.append(
+                catalog.CatalogEntry(
+                    path=file.relative_to(new_path).as_posix(),
+                    size=size,
+                    crc=crcs.get((file.name.lower(), size), ""),
+                )
+            )
+        code = rjcode.get_rjcode(path.name)
+        self.catalog.record(  # type: ignore
+            path.name,
+            new_path,
+            f"RJ{code}" if code else None,
+            new_path.name,
+            entries,
+        )
+        self.logger.info(f"记录到目录 - {len(entries)} 个文件")
+
+    def dedup(self, path: Path):
+        linked, saved = self.deduplicator.dedup(path)  # type: ignore
+        if linked:
+            self.logger.success(
+                f"去重完成 - 链接{linked}个文件，节省{saved / 1024 / 1024:.0f} MB"
+            )
+
+    def _save_pw(self, pw: str):
+        if not pw.startswith("RJ"):
+            self.passwords.save(pw)
+            self.logger.info(f"添加并保存密码： {pw}")
+
+    def unzip(
+        self, path: Path, is_child: bool = False, ask_password: bool = True
+    ) -> bool:
+        """解压文件，密码库无匹配密码时，ask_password 为 False 或用户跳过则返回 False"""
+        if "." not in path.name:
+            self.logger.success(
+                f"Rename {path.name} to {path.with_suffix('.zip').name}"
+            )
+            path = path.rename(path.with_suffix(".zip"))
+        # 密码库为空时也要尝试解压没有加密的压缩包
+        pws = self.passwords.candidates(path.name) or [""]
+        if known_pw := self.known_pws.get(path):
+            pws.insert(0, known_pw)
+        self._is_show_password_info_once = False
+        for pw in pws:
+            try:
+                self.extract(path, pw, is_child)
+                return True
+            except PasswordError:
+                if pw == pws[-1]:
+                    self.logger.error(f"{path.stem} 密码库无匹配密码")
+                    break
+                continue
+            except NotArchiveError:
+                self.logger.error(f"{path.stem} 不是压缩文件")
+                return True
+        if not ask_password:
+            self.logger.info(f"{path.stem} 稍后询问密码，先解压其他文件")
+            return False
+        self.notifier.notify("请输入密码", f"请为 {path} 文件输入密码")
+        while (pw_input := self.prompt.ask_for_password(path.stem)) is not None:
+            try:
+                extracted = self.extract(path, pw_input, is_child)
+            except PasswordError:
+                continue
+            # False 表示没有符合过滤条件的文件，已经跳过，不再询问
+            if extracted:
+                self._save_pw(pw_input)
+            break
+        else:
+            self.logger.warning(f"Skip {path.stem} - 没有输入密码")
+            return False
+        return True
+
+    async def unzip_async(
+        self, path: Path, is_child: bool = False, ask_password: bool = True
+    ) -> bool:
+        return await asyncio.to_thread(self.unzip, path, is_child, ask_password)
+
+    def check_output(self, source: Path):
+        if not self.output:
+            return
+        self.output.mkdir(parents=True, exist_ok=True)
+        if self.output.stat().st_dev == source.stat().st_dev:
+            self.logger.info("输出文件夹与压缩包在同一磁盘，读写会互相竞争")
+
+
+def list_files(path: Path) -> list[File]:
+    return [model.File.from_path(file) for file in path.iterdir() if file.is_file()]
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        extractor: Extractor,
+        scheduler: Scheduler | None = None,
+        verify_workers: int = 0,
+        report_folder: Path | None = None,
+    ) -> None:
+        """
+        Args:
+            extractor (Extractor): 解压单个压缩包
+            scheduler (Scheduler | None): 解压顺序，默认按文件名
+            verify_workers (int): 解压前同时校验的压缩包数，0 表示不校验
+            report_folder (Path | None): 保存校验报告的文件夹，None 时不保存
+        """
+        self.extractor = extractor
+        self.scheduler = scheduler
+        self.verify_workers = verify_workers
+        self.report_folder = report_folder
+
+    @property
+    def logger(self) -> Logger:
+        return self.extractor.logger
+
+    @property
+    def progress(self) -> ProgressSink:
+        return self.extractor.progress
+
+    def schedule(self, files: list[File]) -> list[File]:
+        """按调度策略排序，返回每个任务中用于解压的文件"""
+        if self.scheduler is None:
+            self.scheduler = scheduler.Scheduler()
+        jobs = self.scheduler.schedule(files, self.extractor.passwords.candidates)
+        for job in jobs:
+            for file in job.files[1:]:
+                self.logger.warning(f"Skip {file.name} - 分卷文件，随第一个分卷解压")
+            if job.password:
+                self.extractor.known_pws[job.leader.path] = job.password
+        files[:] = [file for job in jobs for file in job.files]
+        self.progress.set_files(files)
+        return [job.leader for job in jobs]
+
+    def verify(self, files: list[File]) -> list[File]:
+        """解压前校验压缩包，返回可以解压的文件"""
+        self.logger.info(f"开始校验 {len(files)} 个压缩包")
+        report = verify.verify_all(
+            [file.path for file in files],
+            self.extractor.passwords.candidates,
+            self.verify_workers,
+            self.scheduler.limiter if self.scheduler else None,
+        )
+        passed = []
+        for file, result in zip(files, report.results):
+            if result.status == verify.VerifyStatus.CORRUPT:
+                self.logger.error(f"{file.name} 已损坏 - {result.message}")
+            elif result.status == verify.VerifyStatus.NOT_ARCHIVE:
+                self.logger.error(f"{file.name} 不是压缩文件")
+            else:
+                if result.password:
+                    self.extractor.known_pws[file.path] = result.password
+                passed.append(file)
+                continue
+            file.status = model.Status.FAILED
+        self.progress.refresh()
+        report_name = ""
+        if self.report_folder:
+            report_name = f" - {report.save(self.report_folder).name}"
+        self.logger.info(
+            f"校验完成 - 正常 {report.count(verify.VerifyStatus.OK)}，"
+            f"损坏 {report.count(verify.VerifyStatus.CORRUPT)}，"
+            f"非压缩文件 {report.count(verify.VerifyStatus.NOT_ARCHIVE)}，"
+            f"密码未知 {report.count(verify.VerifyStatus.PASSWORD)}{report_name}"
+        )
+        return passed
+
+    def run(self, files: list[File], verify_only: bool = False) -> list[File]:
+        """解压文件夹中的文件，返回解压失败或跳过的文件"""
+        self.progress.set_files(files)
+        leaders = self.schedule(files)
+        if self.verify_workers:
+            leaders = self.verify(leaders)
+        if verify_only:
+            return [file for file in files if file.status == model.Status.FAILED]
+        # 需要输入密码的文件放到最后，不阻塞其他文件
+        deferred = []
+        for file in leaders:
+            self.progress.start(file)
+            done = self.extractor.unzip(file.path, ask_password=False)
+            self.progress.finish(file)
+            if not done:
+                file.status = model.Status.UNDO
+                deferred.append(file)
+            self.progress.refresh()
+        for file in deferred:
+            self.progress.start(file)
+            done = self.extractor.unzip(file.path)
+            self.progress.finish(file)
+            if not done:
+                file.status = model.Status.FAILED
+            self.progress.refresh()
+        self.logger.success("解压完成")
+        return [file for file in files if file.status == model.Status.FAILED]
+
+    async def run_async(
+        self, files: list[File], verify_only: bool = False
+    ) -> list[File]:
+        return await asyncio.to_thread(self.run, files, verify_only)
+
+    def _find(self, files: list[File], folder: Path, name: str) -> File | None:
+        """按文件名查找，不在列表中时（如其他机器添加的文件）从文件夹中读取"""
+        for file in files:
+            if file.name == name:
+                return file
+        if not (folder / name).is_file():
+            return None
+        file = model.File.from_path(folder / name)
+        files.append(file)
+        self.progress.refresh()
+        return file
+
+    def run_worker(self, files: list[File], folder: Path, queue: JobQueue):
+        """与其他机器共享任务队列，直到队列中没有可领取的任务
+
+        Args:
+            files (list[File]): 本机看到的共享文件夹中的文件
+            folder (Path): 共享文件夹，任务名为相对于它的文件名
+            queue (JobQueue): 任务队列
+        """
+        worker = jobqueue.worker_id()
+        self.progress.set_files(files)
+        leaders = self.schedule(files)
+        if self.verify_workers:
+            # 损坏的压缩包不加入队列
+            leaders = self.verify(leaders)
+        queue.enqueue([(file.name, file.size_bytes) for file in leaders])
+        self.logger.info(f"加入任务队列 {queue.path.name} - {worker}")
+        while (name := queue.claim(worker)) is not None:
+            file = self._find(files, folder, name)
+            if file is None:
+                queue.finish(worker, name, jobqueue.JobStatus.FAILED, "文件不存在")
+                continue
+            status, message = jobqueue.JobStatus.DONE, ""
+            with jobqueue.Heartbeat(queue, worker, name) as heartbeat:
+                self.progress.start(file)
+                # 租约被回收后由其他机器解压，不能再删除压缩包
+                self.extractor.confirm = heartbeat.check
+                # 一个压缩包出错不影响这台机器继续领取任务
+                try:
+                    if not self.extractor.unzip(file.path, ask_password=False):
+                        status = jobqueue.JobStatus.PASSWORD
+                        message = "密码库无匹配密码"
+                except LeaseLostError as e:
+                    self.logger.warning(f"{e}，放弃这次解压")
+                    status, message = jobqueue.JobStatus.FAILED, str(e)
+                except Exception as e:
+                    self.logger.error(f"{file.name} 解压失败 - {e}")
+                    status, message = jobqueue.JobStatus.FAILED, str(e)
+                finally:
+                    self.extractor.confirm = None
+                self.progress.finish(file)
+            if status != jobqueue.JobStatus.DONE:
+                file.status = model.Status.FAILED
+            if not queue.finish(worker, name, status, message):
+                self.logger.warning(f"{name} 的租约已被其他机器回收")
+            self.progress.refresh()
+        self.logger.success("队列中没有可领取的任务")
+
+    async def run_worker_async(self, files: list[File], folder: Path, queue: JobQueue):
+        await asyncio.to_thread(self.run_worker, files, folder, queue)
@@ -4,3 +4,19 @@ class NotArchiveError(Exception):
 
 class PasswordError(Exception):
     pass
+
+
+class CorruptArchiveError(Exception):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class LeaseLostError(Exception):
+    pass
+
+
+class UnsupportedArchiveError(Exception):
+    pass
@@ -0,0 +1,226 @@
+""" 多台机器共享的任务队列，使用放在共享存储上的 SQLite 数据库 """
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from enum import Enum
+from pathlib import Path
+
+from exception import LeaseLostError
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL DEFAULT 0,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    current TEXT,
+    heartbeat REAL,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    # 密码库中没有密码，需要人工处理
+    PASSWORD = "password"
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobQueue:
+    def __init__(self, path: Path | str, lease: float = 60, max_attempts: int = 3):
+        """
+        Args:
+            path (Path | str): 数据库文件，多台机器时放在共享存储上
+            lease (float): 租约时长（秒），超时未续约的任务会被其他机器重新领取
+            max_attempts (int): 每个任务最多被领取的次数
+        """
+        self.path = Path(path)
+        self.lease = lease
+        self.max_attempts = max_attempts
+        with closing(sqlite3.connect(self.path, timeout=30)) as db:
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        # 网络存储不支持 WAL 的共享内存，使用默认的回滚日志
+        # 每次操作都重新连接，连接不能跨线程使用
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def enqueue(self, jobs: list[tuple[str, int]]):
+        """添加任务，已存在的任务会被忽略
+
+        Args:
+            jobs (list[tuple[str, int]]): 相对于共享文件夹的文件名和大小，按优先级排序
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.executemany(
+                "INSERT OR IGNORE INTO jobs (name, size, priority, updated) "
+                "VALUES (?, ?, ?, ?)",
+                [(name, size, index, now) for index, (name, size) in enumerate(jobs)],
+            )
+
+    def claim(self, worker: str) -> str | None:
+        """领取一个任务，同时回收过期的租约"""
+        now = time.time()
+        with self._transaction() as db:
+            # 领取次数用完的任务不会再被领取，直接标记为失败
+            db.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, "
+                "message = ?, updated = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (
+                    JobStatus.FAILED.value,
+                    "超过最大领取次数",
+                    now,
+                    JobStatus.RUNNING.value,
+                    now,
+                    self.max_attempts,
+                ),
+            )
+            db.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, updated = ? "
+                "WHERE status = ? AND lease_until < ?",
+                (JobStatus.PENDING.value, now, JobStatus.RUNNING.value, now),
+            )
+            row = db.execute(
+                "SELECT name FROM jobs WHERE status = ? AND attempts < ? "
+                "ORDER BY priority, rowid LIMIT 1",
+                (JobStatus.PENDING.value, self.max_attempts),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated = ? WHERE name = ?",
+                (JobStatus.RUNNING.value, worker, now + self.lease, now, row[0]),
+            )
+            self._touch_worker(db, worker, row[0], now)
+            return row[0]
+
+    @staticmethod
+    def _touch_worker(db: sqlite3.Connection, worker: str, current, now: float):
+        db.execute(
+            "INSERT INTO workers (id, current, heartbeat) VALUES (?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET current = ?, heartbeat = ?",
+            (worker, current, now, current, now),
+        )
+
+    def heartbeat(self, worker: str, name: str | None = None) -> bool:
+        """续约，返回 False 表示租约已经被其他机器回收"""
+        now = time.time()
+        with self._transaction() as db:
+            self._touch_worker(db, worker, name, now)
+            if name is None:
+                return True
+            return (
+                db.execute(
+                    "UPDATE jobs SET lease_until = ?, updated = ? "
+                    "WHERE name = ? AND worker = ? AND status = ?",
+                    (now + self.lease, now, name, worker, JobStatus.RUNNING.value),
+                ).rowcount
+                > 0
+            )
+
+    def finish(
+        self, worker: str, name: str, status: JobStatus, message: str = ""
+    ) -> bool:
+        """返回 False 表示租约已经被其他机器回收，任务状态没有改变"""
+        now = time.time()
+        column = "done" if status == JobStatus.DONE else "failed"
+        with self._transaction() as db:
+            owned = (
+                db.execute(
+                    "UPDATE jobs SET status = ?, message = ?, lease_until = NULL, "
+                    "updated = ? WHERE name = ? AND worker = ? AND status = ?",
+                    (status.value, message, now, name, worker, JobStatus.RUNNING.value),
+                ).rowcount
+                > 0
+            )
+            self._touch_worker(db, worker, None, now)
+            if owned:
+                db.execute(
+                    f"UPDATE workers SET {column} = {column} + 1 WHERE id = ?",
+                    (worker,),
+                )
+        return owned
+
+    def _read(self, sql: str) -> list[sqlite3.Row]:
+        # 只读查询不需要写锁，不阻塞正在领取任务的工作进程
+        with closing(sqlite3.connect(self.path, timeout=30)) as db:
+            db.row_factory = sqlite3.Row
+            return db.execute(sql).fetchall()
+
+    def jobs(self) -> list[sqlite3.Row]:
+        return self._read("SELECT * FROM jobs ORDER BY priority, rowid")
+
+    def workers(self) -> list[sqlite3.Row]:
+        return self._read("SELECT * FROM workers ORDER BY id")
+
+
+class Heartbeat(threading.Thread):
+    """解压期间在后台定时续约"""
+
+    def __init__(self, queue: JobQueue, worker: str, job: str) -> None:
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.worker = worker
+        self.job = job
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.queue.lease / 3):
+            try:
+                if not self.queue.heartbeat(self.worker, self.job):
+                    self.lost = True
+            except sqlite3.OperationalError:
+                # 共享存储暂时不可用，下次再试
+                continue
+
+    def check(self):
+        """立即续约，租约已被回收时抛出 LeaseLostError，用于删除文件等操作之前"""
+        try:
+            if not self.queue.heartbeat(self.worker, self.job):
+                self.lost = True
+        except sqlite3.OperationalError:
+            pass
+        if self.lost:
+            raise LeaseLostError(f"{self.job} 的租约已被其他机器回收")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self._stop_event.set()
+        self.join()
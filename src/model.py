@@ -9,6 +9,7 @@ class Status(Enum):
     UNDO = "[red]X[/red]"
     DONE = "[green]√[/green]"
     DING = Spinner("dots")
+    FAILED = "[red]![/red]"
 
 
 class File(BaseModel):
@@ -18,3 +19,16 @@ class File(BaseModel):
     size: str
     size_bytes: int
     status: Status = Status.UNDO
+
+    @classmethod
+    def from_path(cls, path: Path) -> "File":
+        size = path.stat().st_size
+        return cls(
+            name=path.name, path=path, size=format_file_size(size), size_bytes=size
+        )
+
+
+def format_file_size(size: int) -> str:
+    if size > 1000 * 1024 * 1024:
+        return f"{(size / 1024 / 1024 / 1024):.0f} GB"
+    return f"{(size / 1024 / 1024):.0f} MB"
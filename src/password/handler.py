@@ -1,3 +1,4 @@
+import threading
 from pathlib import Path
 
 from pydantic import BaseModel
@@ -12,36 +13,81 @@ class AllPws(BaseModel):
     passwords: list[Pw]
 
 
+class PasswordStore:
+    """密码库，每个实例的状态互相独立，可以在多个线程中使用"""
+
+    def __init__(self, password_file: Path | None = None) -> None:
+        """
+        Args:
+            password_file (Path | None): 保存密码的文件，None 时只保存在内存中
+        """
+        self.password_file = password_file
+        self.all_pws = AllPws(passwords=[])
+        self._lock = threading.Lock()
+
+    def load_all_pws(self):
+        if self.password_file is None:
+            return
+        with self._lock:
+            if self.password_file.exists():
+                self.all_pws = AllPws.model_validate_json(
+                    self.password_file.read_text()
+                )
+            else:
+                self.password_file.touch()
+                self.password_file.write_text(self.all_pws.model_dump_json(indent=2))
+
+    def save_to_file(self):
+        if self.password_file is None:
+            return
+        with self._lock:
+            self.password_file.write_text(self.all_pws.model_dump_json(indent=2))
+
+    def add_pw(self, pw: str):
+        with self._lock:
+            # check existing passwords
+            for p in self.all_pws.passwords:
+                if p.value == pw:
+                    return False
+            # add new password
+            self.all_pws.passwords.append(Pw(value=pw))
+        self.save_to_file()
+        return True
+
+    def get_all_pws(self, filename: str | None = None):
+        with self._lock:
+            all_pws = self.all_pws.passwords.copy()
+        if filename:
+            if rjcode := get_rjcode(filename):
+                all_pws.extend([Pw(value=f"RJ{rjcode}"), Pw(value=f"rj{rjcode}")])
+        return all_pws
+
+    # engine.PasswordSource
+    def candidates(self, filename: str) -> list[str]:
+        return [pw.value for pw in self.get_all_pws(filename)]
+
+    def save(self, password: str):
+        self.add_pw(password)
+
+
 class PWhandler:
+    """命令行使用的全局密码库"""
+
     password_file = Path(__file__).parent / "passwords.json"
-    all_pws = AllPws(passwords=[])
+    store = PasswordStore(password_file)
 
     @classmethod
     def load_all_pws(cls):
-        if cls.password_file.exists():
-            cls.all_pws = AllPws.model_validate_json(cls.password_file.read_text())
-        else:
-            cls.password_file.touch()
-            cls.password_file.write_text(cls.all_pws.model_dump_json(indent=2))
+        cls.store.load_all_pws()
 
     @classmethod
     def save_to_file(cls):
-        cls.password_file.write_text(cls.all_pws.model_dump_json(indent=2))
+        cls.store.save_to_file()
 
     @classmethod
     def add_pw(cls, pw: str):
-        # check existing passwords
-        for p in cls.all_pws.passwords:
-            if p.value == pw:
-                return False
-        # add new password
-        cls.all_pws.passwords.append(Pw(value=pw))
-        cls.save_to_file()
+        return cls.store.add_pw(pw)
 
     @classmethod
     def get_all_pws(cls, filename: str | None = None):
-        all_pws = cls.all_pws.passwords.copy()
-        if filename:
-            if rjcode := get_rjcode(filename):
-                all_pws.extend([Pw(value=f"RJ{rjcode}"), Pw(value=f"rj{rjcode}")])
-        return all_pws
+        return cls.store.get_all_pws(filename)
@@ -1,6 +1,7 @@
 ﻿import argparse
 from pathlib import Path
 
+from exception import CircuitOpenError
 from util.rjcode import get_rj_title, get_rjcode
 
 
@@ -13,7 +14,15 @@ def rename_directory(path: str | Path):
         if file.is_dir():
             rj_code = f"RJ{get_rjcode(file.name)}"
             if file.name.lower().strip() == rj_code.lower().strip():
-                if title := get_rj_title(file.name):
+                try:
+                    title = get_rj_title(file.name)
+                except CircuitOpenError as e:
+                    print(f"{e}，停止重命名")
+                    break
+                except Exception as e:
+                    print(f"获取 {file.name} 的标题失败 - {e}")
+                    continue
+                if title:
                     file.rename(file.parent / title)
                     print(f"{file.name}已重命名为{title}")
 
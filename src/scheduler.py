@@ -0,0 +1,151 @@
+""" 决定压缩包的解压顺序 """
+import re
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Callable
+
+from exception import CorruptArchiveError, NotArchiveError, PasswordError
+from model import File
+from pydantic import BaseModel
+from util.disk import DiskLimiter
+from util.sevenzip import list_members, test_archive
+
+# 分卷：a.part1.rar / a.7z.001 / a.zip + a.z01 / a.rar + a.r00
+# (正则, 组名的后缀, 顺序的偏移)，a.zip 和 a.rar 本身的顺序为 0
+_VOLUME_PATTERNS = [
+    (re.compile(r"^(.+)\.part(\d+)\.rar$", re.IGNORECASE), ".rar", 0),
+    (re.compile(r"^(.+)\.r(\d{2})$", re.IGNORECASE), ".rar", 1),
+    (re.compile(r"^(.+)\.z(\d{2})$", re.IGNORECASE), ".zip", 1),
+    (re.compile(r"^(.+)\.(\d{3})$", re.IGNORECASE), "", 0),
+]
+
+
+class Policy(Enum):
+    # 按文件名，与 Windows 资源管理器的顺序一致
+    NAME = "name"
+    # 小文件优先
+    SIZE = "size"
+    # 不需要密码和密码库中有密码的优先
+    PASSWORD = "password"
+    # 修改时间早的优先
+    OLDEST = "oldest"
+
+
+class PasswordState(Enum):
+    NONE = 0
+    KNOWN = 1
+    UNKNOWN = 2
+
+
+class Job(BaseModel):
+    files: list[File]
+    password_state: PasswordState = PasswordState.UNKNOWN
+    password: str | None = None
+
+    @property
+    def leader(self) -> File:
+        """分卷中用于解压的文件"""
+        return self.files[0]
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(file.size_bytes for file in self.files)
+
+    @property
+    def mtime(self) -> float:
+        return min(file.path.stat().st_mtime for file in self.files)
+
+
+def volume_key(name: str) -> tuple[str, int]:
+    """返回分卷所属的组和在组内的顺序，顺序最小的用于解压"""
+    for regex, suffix, offset in _VOLUME_PATTERNS:
+        if match := regex.match(name):
+            return f"{match[1]}{suffix}".lower(), int(match[2]) + offset
+    return name.lower(), 0
+
+
+class Scheduler:
+    def __init__(
+        self,
+        policies: list[Policy] | None = None,
+        limiter: DiskLimiter | None = None,
+        workers: int = 4,
+    ) -> None:
+        """
+        Args:
+            policies (list[Policy] | None): 排序依据，依次比较
+            limiter (DiskLimiter | None): 检查密码时每块磁盘的并发限制
+            workers (int): 检查密码的线程数
+        """
+        self.policies = policies or [Policy.NAME]
+        self.limiter = limiter or DiskLimiter()
+        self.workers = workers
+
+    @staticmethod
+    def group(files: list[File]) -> list[Job]:
+        """把分卷归为同一个任务"""
+        groups: dict[str, list[tuple[int, File]]] = {}
+        for file in sorted(files, key=lambda file: file.name.lower()):
+            key, order = volume_key(file.name)
+            groups.setdefault(key, []).append((order, file))
+        return [
+            Job(files=[file for _, file in sorted(group, key=lambda item: item[0])])
+            for group in groups.values()
+        ]
+
+    def _probe(self, job: Job, passwords: list[str]):
+        """只列出文件或校验最小的加密文件，判断密码库中是否有可用的密码"""
+        path = job.leader.path
+        with self.limiter.slot(path):
+            for password in ["", *passwords]:
+                try:
+                    members = list_members(path, password)
+                    encrypted = [m for m in members if m.encrypted and not m.is_dir]
+                    if not encrypted:
+                        job.password_state = (
+                            PasswordState.KNOWN if password else PasswordState.NONE
+                        )
+                    elif not password:
+                        continue
+                    else:
+                        smallest = min(encrypted, key=lambda m: m.size)
+                        test_archive(path, password, [smallest.path])
+                        job.password_state = PasswordState.KNOWN
+                except PasswordError:
+                    continue
+                except (NotArchiveError, CorruptArchiveError):
+                    # 交给解压时处理，密码没有被验证过，不记录
+                    job.password_state = PasswordState.NONE
+                    return
+                job.password = password or None
+                return
+            job.password_state = PasswordState.UNKNOWN
+
+    def _key(self, job: Job) -> tuple:
+        keys = {
+            Policy.NAME: lambda: job.leader.name.lower(),
+            Policy.SIZE: lambda: job.size_bytes,
+            Policy.PASSWORD: lambda: job.password_state.value,
+            Policy.OLDEST: lambda: job.mtime,
+        }
+        return tuple(keys[policy]() for policy in self.policies)
+
+    def schedule(
+        self, files: list[File], get_passwords: Callable[[str], list[str]]
+    ) -> list[Job]:
+        """返回排好序的任务
+
+        Args:
+            files (list[File]): 文件夹中的文件
+            get_passwords (Callable[[str], list[str]]): 根据文件名返回候选密码
+        """
+        jobs = self.group(files)
+        if Policy.PASSWORD in self.policies:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                list(
+                    pool.map(
+                        lambda job: self._probe(job, get_passwords(job.leader.name)),
+                        jobs,
+                    )
+                )
+        return sorted(jobs, key=self._key)
@@ -0,0 +1,24 @@
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class DiskLimiter:
+    """限制同一块磁盘上同时进行的读写任务数"""
+
+    def __init__(self, per_disk: int = 2) -> None:
+        self.per_disk = per_disk
+        self._lock = threading.Lock()
+        self._semaphores: dict[int, threading.Semaphore] = {}
+
+    def _semaphore(self, path: Path) -> threading.Semaphore:
+        device = path.stat().st_dev
+        with self._lock:
+            if device not in self._semaphores:
+                self._semaphores[device] = threading.Semaphore(self.per_disk)
+            return self._semaphores[device]
+
+    @contextmanager
+    def slot(self, path: Path):
+        with self._semaphore(path):
+            yield
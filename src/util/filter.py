@@ -0,0 +1,41 @@
+""" 解压时按文件名和大小筛选压缩包内的文件 """
+import re
+from fnmatch import fnmatch
+
+from pydantic import BaseModel
+
+from .sevenzip import Member
+
+# 压缩包内的压缩包（分卷等）需要继续解压，不受 include 和大小的限制
+_ARCHIVE_REGEX = re.compile(
+    r"\.(zip|rar|7z|z\d{2}|r\d{2}|\d{3}|part\d+\.rar)$", re.IGNORECASE
+)
+
+
+class MemberFilter(BaseModel):
+    include: list[str] = []
+    exclude: list[str] = []
+    min_size: int | None = None
+    max_size: int | None = None
+
+    @staticmethod
+    def _fnmatch(path: str, patterns: list[str]) -> bool:
+        path = path.replace("\\", "/").lower()
+        name = path.rsplit("/", 1)[-1]
+        return any(
+            fnmatch(path, pattern.lower()) or fnmatch(name, pattern.lower())
+            for pattern in patterns
+        )
+
+    def match(self, member: Member) -> bool:
+        if self.exclude and self._fnmatch(member.path, self.exclude):
+            return False
+        if _ARCHIVE_REGEX.search(member.path):
+            return True
+        if self.include and not self._fnmatch(member.path, self.include):
+            return False
+        if self.min_size is not None and member.size < self.min_size:
+            return False
+        if self.max_size is not None and member.size > self.max_size:
+            return False
+        return True
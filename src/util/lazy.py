@@ -0,0 +1,67 @@
+""" 延迟导入，模块在第一次访问属性时才真正加载 """
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+
+
+class _LazyModule(ModuleType):
+    """Python 3.12 之前的 LazyLoader 不是线程安全的，加载期间其他线程会看到空模块
+
+    与 3.12 的实现相同：第一个线程加载，其他线程等待，加载中的重入直接返回。
+    """
+
+    def __getattribute__(self, attr):
+        spec = object.__getattribute__(self, "__spec__")
+        loader_state = spec.loader_state
+        with loader_state["lock"]:
+            if object.__getattribute__(self, "__class__") is _LazyModule:
+                module_class = loader_state["__class__"]
+                if loader_state["is_loading"]:
+                    return module_class.__getattribute__(self, attr)
+                loader_state["is_loading"] = True
+                attrs_now = module_class.__getattribute__(self, "__dict__")
+                attrs_then = loader_state["__dict__"]
+                attrs_updated = {
+                    key: value
+                    for key, value in attrs_now.items()
+                    if key not in attrs_then or attrs_then[key] is not value
+                }
+                spec.loader.exec_module(self)
+                if spec.name in sys.modules and sys.modules[spec.name] is not self:
+                    raise ValueError(
+                        f"module object for {spec.name!r} "
+                        "substituted in sys.modules during a lazy load"
+                    )
+                attrs_now.update(attrs_updated)
+                self.__class__ = module_class
+        return getattr(self, attr)
+
+    def __delattr__(self, attr):
+        self.__getattribute__(attr)
+        delattr(self, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """返回延迟加载的模块，用于减少命令行的启动时间
+
+    只能用于 `module.attr` 形式的访问，`from module import attr` 会立即加载。
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    if sys.version_info < (3, 12):
+        spec.loader_state.update(lock=threading.RLock(), is_loading=False)
+        module.__class__ = _LazyModule
+    # 与 import 一样绑定到父包上，否则之后的 `import a.b; a.b` 会找不到属性
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
@@ -0,0 +1,222 @@
+""" 不依赖 7z 的 zip 解压，按固定大小分块复制，内存占用有上限 """
+import os
+import re
+import struct
+import sys
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from exception import PasswordError, UnsupportedArchiveError
+
+from .filter import MemberFilter
+from .sevenzip import Member
+
+# 解压器自身需要的内存，LZMA 等字典大小不定的压缩方式交给 7z
+_METHOD_OVERHEAD = {
+    zipfile.ZIP_STORED: 0,
+    zipfile.ZIP_DEFLATED: 512 * 1024,
+    zipfile.ZIP_BZIP2: 8 * 1024 * 1024,
+}
+_MIN_CHUNK_SIZE = 64 * 1024
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_USE_SENDFILE = (
+    sys.platform.startswith("linux")
+    and hasattr(os, "sendfile")
+    and hasattr(os, "preadv")
+)
+
+
+def _decode_name(info: zipfile.ZipInfo) -> str:
+    """非 UTF-8 的文件名按 cp932 解码"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode("cp437").decode("cp932")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def _fadvise(fd: int, offset: int, length: int, advice: str):
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, offset, length, getattr(os, advice))
+
+
+class NativeZipExtractor:
+    def __init__(self, memory_limit: int = 16 * 1024 * 1024, workers: int = 1) -> None:
+        """
+        Args:
+            memory_limit (int): 每个线程解压时的内存上限
+            workers (int): 同时解压的文件数
+        """
+        if memory_limit < 2 * _MIN_CHUNK_SIZE:
+            raise ValueError(f"memory limit too small: {memory_limit}")
+        self.memory_limit = memory_limit
+        self.workers = workers
+        self._local = threading.local()
+
+    def _chunk_size(self, method: int) -> int:
+        # ZipExtFile.readinto 会先 read 出一份再复制，缓冲区按两份计算
+        return (self.memory_limit - _METHOD_OVERHEAD[method]) // 2
+
+    def _buffer(self, method: int) -> memoryview:
+        size = max(self._chunk_size(method), _MIN_CHUNK_SIZE)
+        buf = getattr(self._local, "buf", None)
+        if buf is None or len(buf) != size:
+            buf = self._local.buf = memoryview(bytearray(size))
+        return buf
+
+    def _zipfile(self, path: Path) -> zipfile.ZipFile:
+        """每个线程使用自己的文件句柄"""
+        zf = getattr(self._local, "zipfile", None)
+        if zf is None or zf.filename != str(path):
+            zf = self._local.zipfile = zipfile.ZipFile(path)
+        return zf
+
+    def _check_supported(self, infos: list[zipfile.ZipInfo]):
+        for info in infos:
+            if info.compress_type not in _METHOD_OVERHEAD:
+                raise UnsupportedArchiveError(
+                    f"compression method {info.compress_type}"
+                )
+            if self._chunk_size(info.compress_type) < _MIN_CHUNK_SIZE:
+                raise UnsupportedArchiveError(
+                    f"{info.filename} exceeds memory limit"
+                )
+
+    @staticmethod
+    def _target(destination: Path, name: str) -> Path:
+        parts = [
+            re.sub(r'[:*?"<>|]', "_", part)
+            for part in name.replace("\\", "/").split("/")
+            if part not in ("", ".", "..")
+        ]
+        return destination.joinpath(*parts)
+
+    def _copy_stored(self, path: Path, info: zipfile.ZipInfo, out) -> None:
+        """未压缩的文件直接从压缩包中复制，Linux 下使用 sendfile"""
+        with path.open("rb") as src:
+            src.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(src.read(_LOCAL_HEADER.size))
+            offset = info.header_offset + _LOCAL_HEADER.size + header[-2] + header[-1]
+            _fadvise(src.fileno(), offset, info.file_size, "POSIX_FADV_SEQUENTIAL")
+            buf = self._buffer(info.compress_type)
+            crc = 0
+            if _USE_SENDFILE:
+                position, remaining = offset, info.file_size
+                while remaining:
+                    sent = os.sendfile(out.fileno(), src.fileno(), position, remaining)
+                    if not sent:
+                        raise zipfile.BadZipFile(f"Truncated file {info.filename}")
+                    position += sent
+                    remaining -= sent
+                # sendfile 不经过用户空间，从页缓存读回写入的数据计算 CRC
+                position = 0
+                while position < info.file_size:
+                    size = min(info.file_size - position, len(buf))
+                    n = os.preadv(out.fileno(), [buf[:size]], position)
+                    if not n:
+                        raise zipfile.BadZipFile(f"Truncated file {info.filename}")
+                    crc = zlib.crc32(buf[:n], crc)
+                    position += n
+            else:
+                src.seek(offset)
+                remaining = info.file_size
+                while remaining:
+                    n = src.readinto(buf[: min(remaining, len(buf))])
+                    if not n:
+                        raise zipfile.BadZipFile(f"Truncated file {info.filename}")
+                    crc = zlib.crc32(buf[:n], crc)
+                    out.write(buf[:n])
+                    remaining -= n
+            if crc != info.CRC:
+                raise zipfile.BadZipFile(f"Bad CRC-32 for file {info.filename}")
+            _fadvise(src.fileno(), offset, info.file_size, "POSIX_FADV_DONTNEED")
+
+    def _copy(self, path: Path, info: zipfile.ZipInfo, password: str, out) -> None:
+        pwd = password.encode() if password else None
+        try:
+            with self._zipfile(path).open(info, pwd=pwd) as src:
+                buf = self._buffer(info.compress_type)
+                while n := src.readinto(buf):
+                    out.write(buf[:n])
+        except RuntimeError as e:
+            # Bad password / password required
+            raise PasswordError from e
+        except zipfile.BadZipFile as e:
+            # ZipCrypto 只校验一个字节，错误的密码可能到 CRC 校验时才发现
+            if info.flag_bits & 0x1:
+                raise PasswordError from e
+            raise
+
+    def _extract_member(
+        self, path: Path, info: zipfile.ZipInfo, destination: Path, password: str
+    ):
+        target = self._target(destination, _decode_name(info))
+        if info.is_dir():
+            target.mkdir(parents=True, exist_ok=True)
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # 可读写，sendfile 之后需要读回校验
+        with target.open("w+b") as out:
+            if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+                self._copy_stored(path, info, out)
+            else:
+                self._copy(path, info, password, out)
+        mtime = datetime(*info.date_time).timestamp()
+        os.utime(target, (mtime, mtime))
+
+    def extract(
+        self,
+        path: Path,
+        destination: Path,
+        password: str = "",
+        member_filter: MemberFilter | None = None,
+        progress: Callable[[int, str], None] | None = None,
+    ) -> int:
+        """解压 zip 到 destination，返回解压的文件数（不含文件夹）
+
+        不支持的压缩包在写入任何文件之前抛出 UnsupportedArchiveError，
+        密码错误时抛出 PasswordError。
+        """
+        try:
+            with zipfile.ZipFile(path) as zf:
+                infos = zf.infolist()
+        except zipfile.BadZipFile as e:
+            raise UnsupportedArchiveError(str(e)) from e
+        if member_filter:
+            infos = [
+                info
+                for info in infos
+                if info.is_dir()
+                or member_filter.match(
+                    Member(path=_decode_name(info), size=info.file_size)
+                )
+            ]
+        files = sum(not info.is_dir() for info in infos)
+        if not files:
+            # 与 7z 的过滤一致，没有符合条件的文件时不创建任何文件夹
+            return 0
+        self._check_supported(infos)
+        total = sum(info.file_size for info in infos) or 1
+        done = 0
+        lock = threading.Lock()
+
+        def _extract(info: zipfile.ZipInfo):
+            nonlocal done
+            self._extract_member(path, info, destination, password)
+            with lock:
+                done += info.file_size
+                if progress:
+                    progress(done * 100 // total, _decode_name(info))
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                list(pool.map(_extract, infos))
+        finally:
+            self._local = threading.local()
+        return files
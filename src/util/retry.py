@@ -1,37 +1,206 @@
+import inspect
+import random
+import threading
 import time
+from enum import Enum
 from functools import wraps
+from typing import Callable
 
-from loguru import logger
+from exception import CircuitOpenError
+
+from .lazy import lazy_import
+
+# 只有协程调用方需要 asyncio
+asyncio = lazy_import("asyncio")
+loguru = lazy_import("loguru")
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    # 熔断超时后放行一次探测
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """连续失败后熔断，所有调用方直接失败，超时后放行一次探测"""
+
+    def __init__(
+        self, name: str, failure_threshold: int = 3, reset_timeout: float = 60
+    ) -> None:
+        """
+        Args:
+            name (str): 上游服务名，用于日志和错误信息
+            failure_threshold (int): 连续失败多少次后熔断
+            reset_timeout (float): 熔断多少秒后重新探测
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        if self._opened_at is None:
+            return CircuitState.CLOSED
+        if self._probing or time.monotonic() - self._opened_at >= self.reset_timeout:
+            return CircuitState.HALF_OPEN
+        return CircuitState.OPEN
+
+    def allow(self) -> bool:
+        """是否可以调用上游，半开时只放行第一个调用方"""
+        with self._lock:
+            state = self.state
+            if state == CircuitState.CLOSED:
+                return True
+            if state == CircuitState.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} 暂时不可用")
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                loguru.logger.info(f"{self.name} 已恢复")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self):
+        """调用被取消或中断，没有结果，由下一个调用方重新探测"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if not self._probing:
+                    loguru.logger.warning(
+                        f"{self.name} 连续失败 {self._failures} 次，"
+                        f"{self.reset_timeout:.0f} 秒内不再请求"
+                    )
+                self._opened_at = time.monotonic()
+                self._probing = False
 
 
 def retry(
-    times: int = 3, delay: int = 1, backoff: int = 2, exceptions: tuple = (Exception,)
+    times: int = 3,
+    delay: float = 1,
+    backoff: float = 2,
+    exceptions: tuple = (Exception,),
+    *,
+    jitter: float = 0.5,
+    max_delay: float | None = None,
+    deadline: float | None = None,
+    retry_if: Callable[[BaseException], bool] | None = None,
+    breaker: CircuitBreaker | None = None,
 ):
     """Decorator to retry a function/method if an exception occurs.
 
-    :param times: Number of times to retry (not including the first attempt).
+    Works for both sync functions and coroutine functions; coroutines wait
+    with `asyncio.sleep` instead of blocking the thread.
+
+    :param times: Total number of attempts.
     :param delay: Initial delay between retries in seconds.
     :param backoff: Backoff multiplier e.g. value of 2 will double the delay each retry.
-    :param exceptions: Tuple of exceptions to check. May be a tuple of
-        exception classes or a tuple of tuples of exception classes and
-        arguments to pass to the exception constructor.
+    :param exceptions: Tuple of exception classes to retry on.
+    :param jitter: Fraction of each delay that is randomized, spreading out
+        callers that failed together. 0 disables jitter.
+    :param max_delay: Upper bound of a single delay.
+    :param deadline: Overall time budget of a call in seconds, including
+        every attempt. No retry is started that would sleep past it.
+    :param retry_if: Further classification of the caught exceptions, only
+        those for which it returns True are retried.
+    :param breaker: Circuit breaker shared with other callers of the same
+        upstream. Retryable failures count against it, and while it is open
+        calls raise `CircuitOpenError` without running the function. The
+        call whose failure opens it raises `CircuitOpenError` as well.
     :return: The return value of the function that was retried.
     """
 
+    def is_retryable(e: BaseException) -> bool:
+        return isinstance(e, exceptions) and (retry_if is None or retry_if(e))
+
+    def next_delay(name: str, attempt: int, start: float, e: BaseException):
+        """返回下次重试前等待的秒数，不应重试时返回 None"""
+        if not is_retryable(e):
+            # 上游有响应，只是结果不对，不算作上游故障
+            if breaker:
+                breaker.record_success()
+            return None
+        if breaker:
+            breaker.record_failure()
+            if breaker.state != CircuitState.CLOSED:
+                # 与熔断期间的调用方一致，调用方只需要处理 CircuitOpenError
+                raise CircuitOpenError(f"{breaker.name} 暂时不可用") from e
+        if attempt >= times:
+            return None
+        wait = delay * backoff ** (attempt - 1)
+        if max_delay is not None:
+            wait = min(wait, max_delay)
+        wait *= 1 - jitter * random.random()
+        if deadline is not None and time.monotonic() - start + wait > deadline:
+            return None
+        loguru.logger.warning(f"{name}, Retrying in {wait:.2f} seconds... - {e}")
+        return wait
+
     def deco_retry(f):
+        if inspect.iscoroutinefunction(f):
+
+            @wraps(f)
+            async def f_retry_async(*args, **kwargs):
+                start = time.monotonic()
+                for attempt in range(1, max(times, 1) + 1):
+                    if breaker:
+                        breaker.check()
+                    try:
+                        result = await f(*args, **kwargs)
+                    except exceptions as e:
+                        wait = next_delay(f.__name__, attempt, start, e)
+                        if wait is None:
+                            raise
+                        await asyncio.sleep(wait)
+                        continue
+                    except BaseException:
+                        # 包括 CancelledError，不释放的话熔断器会一直处于半开
+                        if breaker:
+                            breaker.release()
+                        raise
+                    if breaker:
+                        breaker.record_success()
+                    return result
+
+            return f_retry_async
+
         @wraps(f)
         def f_retry(*args, **kwargs):
-            mtries, mdelay = times, delay
-            while mtries > 1:
+            start = time.monotonic()
+            for attempt in range(1, max(times, 1) + 1):
+                if breaker:
+                    breaker.check()
                 try:
-                    return f(*args, **kwargs)
-                except exceptions:
-                    msg = f"{f.__name__}, Retrying in {mdelay} seconds..."
-                    logger.warning(msg)
-                    time.sleep(mdelay)
-                    mtries -= 1
-                    mdelay *= backoff
-            return f(*args, **kwargs)
+                    result = f(*args, **kwargs)
+                except exceptions as e:
+                    wait = next_delay(f.__name__, attempt, start, e)
+                    if wait is None:
+                        raise
+                    time.sleep(wait)
+                    continue
+                except BaseException:
+                    if breaker:
+                        breaker.release()
+                    raise
+                if breaker:
+                    breaker.record_success()
+                return result
 
         return f_retry  # true decorator
 
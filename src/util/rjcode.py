@@ -1,9 +1,13 @@
 import re
 
-import httpx
-from lxml import html
+from .lazy import lazy_import
+from .retry import CircuitBreaker, retry
 
-from .retry import retry
+httpx = lazy_import("httpx")
+html = lazy_import("lxml.html")
+
+# 所有调用方共用，HVDB 不可用时不再逐个等待超时
+hvdb_breaker = CircuitBreaker("HVDB", failure_threshold=3, reset_timeout=60)
 
 
 def get_rjcode(value: str) -> str | None:
@@ -12,28 +16,44 @@ def get_rjcode(value: str) -> str | None:
         return res[0]
 
 
-@retry()
+def _is_transient(e: BaseException) -> bool:
+    """只重试网络错误、超时和 5xx，在出错时才加载 httpx"""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500
+    return isinstance(e, httpx.TransportError)
+
+
 def get_rj_title(value: str) -> str | None:
+    """获取 RJ 号的标题，HVDB 不可用时抛出 CircuitOpenError"""
     rjcode = get_rjcode(value)
     if not rjcode:
+        # 没有 RJ 号时不请求 HVDB，也不受熔断影响
         return
-    rjcode = f"RJ{rjcode}"
+    return _fetch_title(f"RJ{rjcode}")
+
+
+@retry(times=3, delay=0.5, deadline=10, retry_if=_is_transient, breaker=hvdb_breaker)
+def _fetch_title(rjcode: str) -> str | None:
     url = (
         "https://hvdb.me/Dashboard/Details/RJ"
         f"{rjcode[3:] if rjcode[2] == '0' else rjcode[2:]}"
     )
-    with httpx.Client() as client:
+    with httpx.Client(timeout=5) as client:
         text = _get_title(client, url)
     return f"{rjcode} {text}" if text else None
 
 
 def _get_title(client, url):
     res = client.get(url)
+    if res.status_code >= 500:
+        res.raise_for_status()
     if res.status_code != 200:
         return None
     text = res.text
     tree = html.fromstring(text)
     title = tree.xpath("//input[@id='Name']/@value")
+    if not title:
+        return None
     # 替换掉windows文件名中不允许的字符
     title = re.sub(r'[\\/:*?"<>|]', "", title[0])
     return title.strip()
@@ -0,0 +1,100 @@
+""" 7z 命令行的非交互调用 """
+import subprocess
+from pathlib import Path
+
+from exception import CorruptArchiveError, NotArchiveError, PasswordError
+from pydantic import BaseModel
+
+
+class Member(BaseModel):
+    path: str
+    size: int = 0
+    crc: str = ""
+    is_dir: bool = False
+    encrypted: bool = False
+    method: str = ""
+
+
+def _run(
+    command: str,
+    path: Path,
+    password: str = "",
+    switches: list[str] | None = None,
+    members: list[str] | None = None,
+) -> subprocess.CompletedProcess:
+    # 总是传入 -p，避免 7z 等待输入密码
+    switches = [*(switches or []), f"-p{password}", "-sccUTF-8"]
+    if members:
+        # 文件名中的 * 和 ? 不作为通配符
+        switches.append("-spd")
+    # -- 之后的参数不会被当作开关，文件名可能以 - 开头
+    return subprocess.run(
+        ["7z", command, *switches, "--", str(path), *(members or [])],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+
+
+def _raise_for_output(output: str):
+    if "Wrong password" in output:
+        raise PasswordError
+    if "Can not open the file as archive" in output or (
+        "Cannot open the file as archive" in output
+    ):
+        raise NotArchiveError
+
+
+def _parse_block(block: str) -> Member | None:
+    props = {}
+    for line in block.splitlines():
+        key, sep, value = line.partition(" = ")
+        if sep:
+            props[key.strip()] = value.strip()
+    if "Path" not in props:
+        return None
+    return Member(
+        path=props["Path"],
+        size=int(props.get("Size") or 0),
+        crc=props.get("CRC", ""),
+        is_dir=props.get("Folder") == "+" or "D" in props.get("Attributes", "")[:1],
+        encrypted=props.get("Encrypted") == "+",
+        method=props.get("Method", ""),
+    )
+
+
+def list_members(path: Path, password: str = "") -> list[Member]:
+    """列出压缩包内的文件，密码错误时抛出 PasswordError"""
+    process = _run("l", path, password, ["-slt"])
+    output = process.stdout + process.stderr
+    if process.returncode != 0:
+        _raise_for_output(output)
+    # 分隔线之前是压缩包本身的信息
+    _, sep, body = process.stdout.partition("\n----------\n")
+    if not sep:
+        return []
+    return [
+        member
+        for block in body.split("\n\n")
+        if (member := _parse_block(block)) is not None
+    ]
+
+
+def test_archive(path: Path, password: str = "", members: list[str] | None = None):
+    """使用 7z t 校验压缩包的 CRC，不写入磁盘，members 为空时校验全部文件
+
+    Raises:
+        PasswordError: 密码错误
+        NotArchiveError: 不是压缩文件
+        CorruptArchiveError: 压缩包已损坏
+    """
+    process = _run("t", path, password, members=members)
+    # 1 为警告（如压缩包末尾有多余数据），不影响解压
+    if process.returncode <= 1:
+        return
+    output = process.stdout + process.stderr
+    _raise_for_output(output)
+    errors = [line for line in output.splitlines() if "ERROR" in line.upper()]
+    raise CorruptArchiveError(errors[0].strip() if errors else output.strip())
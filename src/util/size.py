@@ -0,0 +1,11 @@
+import re
+
+_SIZE_REGEX = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*$", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_size(value: str) -> int:
+    """把 500M、2G 这类字符串转换为字节数"""
+    if not (match := _SIZE_REGEX.match(value)):
+        raise ValueError(f"invalid size: {value}")
+    return int(float(match[1]) * _SIZE_UNITS[match[2].upper()])
@@ -0,0 +1,93 @@
+""" 解压前并行校验压缩包，损坏的压缩包不会写入磁盘 """
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Callable
+
+from exception import CorruptArchiveError, NotArchiveError, PasswordError
+from pydantic import BaseModel
+from util.disk import DiskLimiter
+from util.sevenzip import test_archive
+
+
+class VerifyStatus(Enum):
+    OK = "ok"
+    CORRUPT = "corrupt"
+    NOT_ARCHIVE = "not_archive"
+    # 密码库中没有可用的密码，无法校验
+    PASSWORD = "password"
+
+
+class VerifyResult(BaseModel):
+    path: Path
+    status: VerifyStatus
+    password: str | None = None
+    message: str = ""
+
+
+class VerifyReport(BaseModel):
+    created: datetime
+    results: list[VerifyResult]
+
+    def count(self, status: VerifyStatus) -> int:
+        return sum(result.status == status for result in self.results)
+
+    def save(self, folder: Path) -> Path:
+        """同时运行的多个任务各自保存，不会覆盖其他任务的报告"""
+        folder.mkdir(parents=True, exist_ok=True)
+        name = f"verify-{self.created:%Y%m%d-%H%M%S-%f}"
+        file = folder / f"{name}.json"
+        index = 0
+        while True:
+            try:
+                with file.open("x", encoding="utf-8") as f:
+                    f.write(self.model_dump_json(indent=2))
+                return file
+            except FileExistsError:
+                index += 1
+                file = folder / f"{name}-{index}.json"
+
+
+def verify_archive(path: Path, passwords: list[str]) -> VerifyResult:
+    """依次尝试无密码和密码库中的密码校验压缩包"""
+    for password in ["", *passwords]:
+        try:
+            test_archive(path, password)
+        except PasswordError:
+            continue
+        except NotArchiveError:
+            return VerifyResult(path=path, status=VerifyStatus.NOT_ARCHIVE)
+        except CorruptArchiveError as e:
+            return VerifyResult(
+                path=path, status=VerifyStatus.CORRUPT, message=str(e)
+            )
+        return VerifyResult(
+            path=path, status=VerifyStatus.OK, password=password or None
+        )
+    return VerifyResult(path=path, status=VerifyStatus.PASSWORD)
+
+
+def verify_all(
+    paths: list[Path],
+    get_passwords: Callable[[str], list[str]],
+    workers: int = 4,
+    limiter: DiskLimiter | None = None,
+) -> VerifyReport:
+    """并行校验多个压缩包
+
+    Args:
+        paths (list[Path]): 压缩包，分卷只需要传入第一个
+        get_passwords (Callable[[str], list[str]]): 根据文件名返回候选密码
+        workers (int): 同时校验的压缩包数
+        limiter (DiskLimiter | None): 每块磁盘同时校验的压缩包数
+    """
+    limiter = limiter or DiskLimiter(workers)
+
+    def _verify(path: Path) -> VerifyResult:
+        with limiter.slot(path):
+            return verify_archive(path, get_passwords(path.name))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_verify, paths))
+    return VerifyReport(created=datetime.now(), results=results)